@@ -1,8 +1,11 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
+import math
 import time
-from datetime import datetime
 from dataclasses import dataclass
-from collections import defaultdict
+from .quantiles import LatencyHistogram
+from .ring_buffer import MetricsRingBuffer
+from .resources import ResourceSampler, ResourceStats
+from .windows import WindowedMetrics
 
 @dataclass
 class PerformanceMetrics:
@@ -11,74 +14,172 @@ class PerformanceMetrics:
     error_rate: float
     resource_usage: Dict[str, float]
 
+@dataclass
+class RunningStats:
+    """Constant-size aggregate of task outcomes, updated as each task ends"""
+    count: int = 0
+    successes: int = 0
+    errors: int = 0
+    duration_sum: float = 0.0
+    duration_sum_squares: float = 0.0
+
+    def record(self, duration: float, success: bool, error: bool):
+        self.count += 1
+        self.successes += success
+        self.errors += error
+        self.duration_sum += duration
+        self.duration_sum_squares += duration * duration
+
+    @property
+    def mean_duration(self) -> float:
+        return self.duration_sum / self.count if self.count else 0.0
+
+    @property
+    def duration_stddev(self) -> float:
+        if self.count < 2:
+            return 0.0
+        variance = (self.duration_sum_squares - self.duration_sum * self.mean_duration) / (self.count - 1)
+        # Rounding can push the variance of near-identical durations slightly negative
+        return math.sqrt(max(variance, 0.0))
+
+    @property
+    def success_rate(self) -> float:
+        return self.successes / self.count if self.count else 0.0
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.count if self.count else 0.0
+
 class AdvancedMetricsCollector:
-    def __init__(self):
-        self.metrics_store = []
+    def __init__(
+        self,
+        keep_raw: bool = True,
+        raw_capacity: int = 1_000_000,
+        resource_sample_rate: float = 0.1,
+        trace_allocations: bool = False
+    ):
+        # Per-task records are only needed for ad hoc analysis; the aggregates below answer every report
+        self.keep_raw = keep_raw
+        self.metrics_store = MetricsRingBuffer(raw_capacity) if keep_raw else None
         self.start_times: Dict[str, float] = {}
         self.performance_history: Dict[str, List[PerformanceMetrics]] = {}
+        self.overall_stats = RunningStats()
+        self.agent_stats: Dict[str, RunningStats] = {}
+        self.task_type_stats: Dict[str, RunningStats] = {}
+        self.agent_latency: Dict[str, LatencyHistogram] = {}
+        self.task_type_latency: Dict[str, LatencyHistogram] = {}
+        self.resource_sampler = ResourceSampler(resource_sample_rate, trace_allocations)
+        self.agent_resources: Dict[str, ResourceStats] = {}
+        self.task_type_resources: Dict[str, ResourceStats] = {}
+        # Recent behaviour for routing; lifetime aggregates above react too slowly
+        self.windows = WindowedMetrics()
 
     def start_task_monitoring(self, task_id: str, agent_id: str):
         self.start_times[task_id] = time.time()
+        self.resource_sampler.start(task_id)
 
-    def end_task_monitoring(self, task_id: str, agent_id: str, result: Dict[str, Any]):
-        duration = time.time() - self.start_times[task_id]
-        
-        metrics = {
-            'task_id': task_id,
-            'agent_id': agent_id,
-            'duration': duration,
-            'timestamp': datetime.now(),
-            'success': result.get('status') == 'completed',
-            'error': result.get('error', None),
-        }
-        
-        self.metrics_store.append(metrics)
+    def end_task_monitoring(self, task_id: str, agent_id: str, result: Dict[str, Any], task_type: Optional[str] = None):
+        duration = time.time() - self.start_times.pop(task_id)
+        sample = self.resource_sampler.stop(task_id)
+        if sample is not None:
+            self.agent_resources.setdefault(agent_id, ResourceStats()).record(sample)
+            if task_type is not None:
+                self.task_type_resources.setdefault(task_type, ResourceStats()).record(sample)
+        success = result.get('status') == 'completed'
+        error = result.get('error', None)
+
+        self.overall_stats.record(duration, success, error is not None)
+        self.agent_stats.setdefault(agent_id, RunningStats()).record(duration, success, error is not None)
+        self.agent_latency.setdefault(agent_id, LatencyHistogram()).record(duration)
+        self.windows.record(agent_id, duration, error is not None or not success)
+        if task_type is not None:
+            self.task_type_stats.setdefault(task_type, RunningStats()).record(duration, success, error is not None)
+            self.task_type_latency.setdefault(task_type, LatencyHistogram()).record(duration)
+
+        if self.keep_raw:
+            self.metrics_store.append(agent_id, duration, success, error, task_type)
 
     def get_agent_performance(self, agent_id: str) -> PerformanceMetrics:
-        agent_metrics = [m for m in self.metrics_store if m['agent_id'] == agent_id]
+        stats = self.agent_stats.get(agent_id)
         
-        if not agent_metrics:
-            return PerformanceMetrics(0.0, 0.0, 0.0, {'cpu': 0.0, 'memory': 0.0})
-        
-        total_tasks = len(agent_metrics)
-        successful_tasks = sum(1 for m in agent_metrics if m['success'])
-        error_tasks = sum(1 for m in agent_metrics if m['error'] is not None)
-        avg_duration = sum(m['duration'] for m in agent_metrics) / total_tasks
+        if stats is None:
+            return PerformanceMetrics(0.0, 0.0, 0.0, ResourceStats().usage())
         
         return PerformanceMetrics(
-            task_completion_time=avg_duration,
-            success_rate=successful_tasks / total_tasks,
-            error_rate=error_tasks / total_tasks,
-            resource_usage={'cpu': 0.5, 'memory': 0.3}  # Example values
+            task_completion_time=stats.mean_duration,
+            success_rate=stats.success_rate,
+            error_rate=stats.error_rate,
+            resource_usage=self.agent_resources.get(agent_id, ResourceStats()).usage()
         )
 
+    def get_recent_performance(self, agent_id: str) -> Dict[str, Dict[str, float]]:
+        """Throughput, error rate and latency percentiles over the last 1, 5 and 15 minutes"""
+        return self.windows.snapshot(agent_id)
+
+    def get_task_type_performance(self, task_type: str) -> RunningStats:
+        return self.task_type_stats.get(task_type, RunningStats())
+
+    def get_latency_percentiles(self, agent_id: Optional[str] = None, task_type: Optional[str] = None) -> Dict[str, float]:
+        """Return p50/p90/p99/max task duration for an agent or a task type"""
+        if agent_id is not None:
+            histogram = self.agent_latency.get(agent_id)
+        else:
+            histogram = self.task_type_latency.get(task_type)
+        return (histogram or LatencyHistogram()).percentiles()
+
+    def merge_latency(self, agent_latency: Dict[str, Dict[str, Any]], task_type_latency: Dict[str, Dict[str, Any]]):
+        """Fold in histograms exported by another process with export_latency"""
+        for target, exported in ((self.agent_latency, agent_latency), (self.task_type_latency, task_type_latency)):
+            for key, data in exported.items():
+                histogram = LatencyHistogram.from_dict(data)
+                if key in target:
+                    target[key].merge(histogram)
+                else:
+                    target[key] = histogram
+
+    def export_latency(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        return {
+            'agent_latency': {key: h.to_dict() for key, h in self.agent_latency.items()},
+            'task_type_latency': {key: h.to_dict() for key, h in self.task_type_latency.items()}
+        }
+
     def generate_performance_report(self) -> Dict[str, Any]:
-        if not self.metrics_store:
+        if not self.overall_stats.count:
             return {
                 'overall_success_rate': 0.0,
                 'average_task_duration': 0.0,
                 'total_tasks_processed': 0,
-                'agent_performances': {}
+                'agent_performances': {},
+                'task_type_performances': {}
             }
 
-        total_tasks = len(self.metrics_store)
-        successful_tasks = sum(1 for m in self.metrics_store if m['success'])
-        
-        # Group by agent
-        agent_metrics = defaultdict(list)
-        for metric in self.metrics_store:
-            agent_metrics[metric['agent_id']].append(metric)
-            
         agent_performances = {}
-        for agent_id, metrics in agent_metrics.items():
+        for agent_id, stats in self.agent_stats.items():
             agent_performances[agent_id] = {
-                'duration': sum(m['duration'] for m in metrics) / len(metrics),
-                'success': sum(1 for m in metrics if m['success']) / len(metrics)
+                'duration': stats.mean_duration,
+                'duration_stddev': stats.duration_stddev,
+                'success': stats.success_rate,
+                'latency': self.agent_latency[agent_id].percentiles(),
+                'resources': self.agent_resources.get(agent_id, ResourceStats()).usage(),
+                'recent': self.windows.snapshot(agent_id)
+            }
+
+        task_type_performances = {}
+        for task_type, stats in self.task_type_stats.items():
+            task_type_performances[task_type] = {
+                'count': stats.count,
+                'duration': stats.mean_duration,
+                'duration_stddev': stats.duration_stddev,
+                'success': stats.success_rate,
+                'errors': stats.error_rate,
+                'latency': self.task_type_latency[task_type].percentiles(),
+                'resources': self.task_type_resources.get(task_type, ResourceStats()).usage()
             }
 
         return {
-            'overall_success_rate': successful_tasks / total_tasks,
-            'average_task_duration': sum(m['duration'] for m in self.metrics_store) / total_tasks,
-            'total_tasks_processed': total_tasks,
-            'agent_performances': agent_performances
+            'overall_success_rate': self.overall_stats.success_rate,
+            'average_task_duration': self.overall_stats.mean_duration,
+            'total_tasks_processed': self.overall_stats.count,
+            'agent_performances': agent_performances,
+            'task_type_performances': task_type_performances
         } 
\ No newline at end of file
@@ -4,6 +4,7 @@ from dataclasses import dataclass
 import backoff
 import aioboto3
 from redis import asyncio as aioredis
+from ..core.tracing import tracer
 
 @dataclass
 class AgentConfig:
@@ -29,16 +30,20 @@ class AgentConnector:
     @backoff.on_exception(backoff.expo, Exception, max_tries=3)
     async def execute_with_retry(self, agent_id: str, task: Dict) -> Dict:
         """Execute task with automatic retries and rate limiting"""
-        config = self.configs[agent_id]
-        
-        # Check version compatibility
-        current_version = await self.cache.get(f"agent_version:{agent_id}")
-        if current_version != config.api_version:
-            await self._handle_version_mismatch(agent_id, current_version)
+        # One span per attempt; backoff retries show up as siblings
+        with tracer.span("connector.execute", agent_id=agent_id):
+            config = self.configs[agent_id]
             
-        # Apply rate limiting
-        async with self._rate_limiter(agent_id):
-            return await self._execute_task(agent_id, task)
+            # Check version compatibility
+            with tracer.span("connector.version_check"):
+                current_version = await self.cache.get(f"agent_version:{agent_id}")
+            if current_version != config.api_version:
+                await self._handle_version_mismatch(agent_id, current_version)
+                
+            # Apply rate limiting
+            async with self._rate_limiter(agent_id):
+                with tracer.span("agent.call", agent_id=agent_id):
+                    return await self._execute_task(agent_id, task)
             
     async def _handle_version_mismatch(self, agent_id: str, current_version: str):
         """Handle version conflicts"""
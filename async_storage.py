@@ -0,0 +1,95 @@
+from typing import Dict, Any, List, Optional, Tuple
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from ..core.interfaces import WorkflowData, TaskData
+from .persistence import StorageBackend
+from .write_behind import WriteBehindQueue
+
+class AsyncWorkflowStorage:
+    """Awaitable facade over a storage backend that never runs database I/O on the event loop.
+
+    Writes go to a dedicated writer thread that commits everything queued at
+    the same time in one transaction; awaiting a save returns once its batch
+    is committed. Reads run concurrently on a thread pool, each thread using
+    a connection from the storage's read-only pool. get_workflow also sees
+    steps that are queued but not yet committed; the list_* queries only
+    see committed rows.
+    """
+    def __init__(
+        self,
+        storage: StorageBackend,
+        max_queue_size: int = 10000,
+        batch_size: int = 512,
+        read_workers: Optional[int] = None
+    ):
+        self.storage = storage
+        self.writer = WriteBehindQueue(storage, max_queue_size=max_queue_size, batch_size=batch_size)
+        self._read_executor = ThreadPoolExecutor(
+            max_workers=read_workers or storage.read_pool_size,
+            thread_name_prefix="workflow-storage-read"
+        )
+
+    @property
+    def read_executor(self) -> ThreadPoolExecutor:
+        """The pool reads run on, for callers that read the storage directly"""
+        return self._read_executor
+
+    async def save_workflow(self, workflow: WorkflowData, agent_id: str):
+        future = self._completion_future()
+        await self.writer.submit_workflow_async(workflow, agent_id, on_done=self._settle(future))
+        await future
+
+    async def save_workflows(self, batch: List[Tuple[WorkflowData, str]]):
+        await asyncio.gather(*(self.save_workflow(workflow, agent_id) for workflow, agent_id in batch))
+
+    async def save_task(self, task: TaskData, workflow_id: str, status: str, result: Dict[str, Any]):
+        future = self._completion_future()
+        await self.writer.submit_task_async(task, workflow_id, status, result, on_done=self._settle(future))
+        await future
+
+    async def save_tasks(self, batch: List[Tuple[TaskData, str, str, Dict[str, Any]]]):
+        await asyncio.gather(*(self.save_task(*record) for record in batch))
+
+    async def get_workflow(self, workflow_id: str, offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+        return await self._read(self.writer.get_workflow, workflow_id, offset, limit)
+
+    async def list_workflows(self, **filters) -> Tuple[List[Dict[str, Any]], Optional[Tuple[str, str]]]:
+        return await self._read(partial(self.storage.list_workflows, **filters))
+
+    async def list_tasks(self, **filters) -> Tuple[List[Dict[str, Any]], Optional[Tuple[str, str]]]:
+        return await self._read(partial(self.storage.list_tasks, **filters))
+
+    async def flush(self):
+        await asyncio.get_running_loop().run_in_executor(None, self.writer.flush)
+
+    async def close(self):
+        """Commit outstanding writes and release the I/O threads"""
+        await asyncio.get_running_loop().run_in_executor(None, self.writer.close)
+        self._read_executor.shutdown(wait=True)
+
+    async def _read(self, method, *args):
+        # run_in_executor drops context variables; carry them so storage spans join the caller's trace
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            self._read_executor, partial(context.run, method, *args)
+        )
+
+    def _completion_future(self) -> asyncio.Future:
+        return asyncio.get_running_loop().create_future()
+
+    @staticmethod
+    def _settle(future: asyncio.Future):
+        loop = future.get_loop()
+
+        def resolve(error: Optional[Exception]):
+            if future.done():
+                return
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(error)
+
+        # The writer thread reports completion; the future is resolved on its own loop
+        return lambda error: loop.call_soon_threadsafe(resolve, error)
@@ -0,0 +1,273 @@
+from typing import Dict, Any, List, Optional, Tuple, Union
+import heapq
+import os
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from ..utils.exceptions import WorkflowError
+from .persistence import StorageBackend, WorkflowStorage, WorkflowBatch, TaskBatch, Page, format_timestamp
+
+def _workflow_key(row: Dict[str, Any]) -> Tuple[str, str]:
+    return (row['created_at'], row['workflow_id'])
+
+def _task_key(row: Dict[str, Any]) -> Tuple[str, str]:
+    return (row['created_at'], row['task_id'])
+
+class ShardedWorkflowStorage(StorageBackend):
+    """Spreads workflows across shard_count SQLite files by a hash of workflow_id.
+
+    Every shard has its own writer, so saves to different shards commit in
+    parallel. Tasks live in their workflow's shard. Listing queries fan out to
+    all shards concurrently and merge the sorted pages, so keyset cursors work
+    as they do on a single file. A batch spanning several shards is committed
+    per shard, not atomically.
+    """
+    def __init__(self, db_path: str = "workflows.db", shard_count: int = 4, **storage_options):
+        root, extension = os.path.splitext(db_path)
+        self.shards = [
+            WorkflowStorage(f"{root}.{index}{extension}", **storage_options)
+            for index in range(shard_count)
+        ]
+        self.read_pool_size = sum(shard.read_pool_size for shard in self.shards)
+        self._executor = ThreadPoolExecutor(max_workers=shard_count, thread_name_prefix="workflow-shard")
+
+    def shard_for(self, workflow_id: str) -> WorkflowStorage:
+        # crc32 is stable across processes, unlike hash()
+        return self.shards[zlib.crc32(workflow_id.encode('utf-8')) % len(self.shards)]
+
+    def _group(self, records: List[Any], workflow_id_of) -> Dict[int, List[Any]]:
+        groups: Dict[int, List[Any]] = {}
+        for record in records:
+            groups.setdefault(id(self.shard_for(workflow_id_of(record))), []).append(record)
+        return groups
+
+    def _for_each_shard(self, call, shards: Optional[List[WorkflowStorage]] = None) -> List[Any]:
+        """Run call(shard) on every shard in parallel and return the results in shard order"""
+        return list(self._executor.map(call, shards if shards is not None else self.shards))
+
+    def _run_grouped(self, records: List[Any], workflow_id_of, method: str):
+        shards_by_id = {id(shard): shard for shard in self.shards}
+        groups = self._group(records, workflow_id_of)
+        self._for_each_shard(
+            lambda shard: getattr(shard, method)(groups[id(shard)]),
+            [shards_by_id[shard_id] for shard_id in groups]
+        )
+
+    def save_workflows(self, batch: WorkflowBatch):
+        self._run_grouped(batch, lambda record: record[0].workflow_id, 'save_workflows')
+
+    def save_tasks(self, batch: TaskBatch):
+        self._run_grouped(batch, lambda record: record[1], 'save_tasks')
+
+    def delete_workflows(self, workflow_ids: List[str]):
+        self._run_grouped(workflow_ids, lambda workflow_id: workflow_id, 'delete_workflows')
+
+    def get_workflow(self, workflow_id: str, offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+        return self.shard_for(workflow_id).get_workflow(workflow_id, offset, limit)
+
+    def list_workflows(
+        self,
+        agent_id: Optional[str] = None,
+        since: Optional[Union[datetime, str]] = None,
+        until: Optional[Union[datetime, str]] = None,
+        limit: int = 100,
+        after: Optional[Tuple[str, str]] = None
+    ) -> Page:
+        pages = self._for_each_shard(
+            lambda shard: shard.list_workflows(agent_id, since, until, limit, after)[0]
+        )
+        return self._merge(pages, _workflow_key, limit)
+
+    def list_tasks(
+        self,
+        status: Optional[str] = None,
+        workflow_id: Optional[str] = None,
+        limit: int = 100,
+        after: Optional[Tuple[str, str]] = None
+    ) -> Page:
+        if workflow_id is not None:
+            return self.shard_for(workflow_id).list_tasks(status, workflow_id, limit, after)
+        pages = self._for_each_shard(lambda shard: shard.list_tasks(status, None, limit, after)[0])
+        return self._merge(pages, _task_key, limit)
+
+    def find_expired_workflows(
+        self,
+        older_than: Optional[Union[datetime, str]] = None,
+        max_per_agent: Optional[int] = None,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        pages = self._for_each_shard(
+            lambda shard: shard.find_expired_workflows(older_than, max_per_agent, limit)
+        )
+        expired = {row['workflow_id']: row for page in pages for row in page}
+        if max_per_agent is not None:
+            # A workflow in its shard's newest N can still fall outside its agent's newest N overall
+            candidates: Dict[str, List[Dict[str, Any]]] = {}
+            for page in self._for_each_shard(lambda shard: shard.newest_workflows_per_agent(max_per_agent)):
+                for row in page:
+                    candidates.setdefault(row['agent_id'], []).append(row)
+            for rows in candidates.values():
+                rows.sort(key=_workflow_key, reverse=True)
+                for row in rows[max_per_agent:]:
+                    expired[row['workflow_id']] = row
+        return sorted(expired.values(), key=_workflow_key)[:limit]
+
+    def incremental_vacuum(self, pages: int = 256) -> int:
+        return sum(self._for_each_shard(lambda shard: shard.incremental_vacuum(pages)))
+
+    def incremental_vacuum_enabled(self) -> bool:
+        return all(self._for_each_shard(lambda shard: shard.incremental_vacuum_enabled()))
+
+    def enable_incremental_vacuum(self):
+        self._for_each_shard(lambda shard: shard.enable_incremental_vacuum())
+
+    def close(self):
+        for shard in self.shards:
+            shard.close()
+        self._executor.shutdown(wait=True)
+
+    @staticmethod
+    def _merge(pages: List[List[Dict[str, Any]]], key, limit: int) -> Page:
+        rows = list(heapq.merge(*pages, key=key))[:limit]
+        cursor = key(rows[-1]) if len(rows) == limit else None
+        return rows, cursor
+
+class InMemoryWorkflowStorage(StorageBackend):
+    """Dictionary-backed storage with the same semantics as WorkflowStorage, for tests"""
+    def __init__(self):
+        self.workflows: Dict[str, Dict[str, Any]] = {}
+        self.steps: Dict[str, List[Dict[str, Any]]] = {}
+        self.tasks: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def save_workflows(self, batch: WorkflowBatch):
+        now = format_timestamp(datetime.now())
+        with self._lock:
+            # Checked up front so a gap leaves nothing applied, like WorkflowStorage's rollback
+            counts: Dict[str, int] = {}
+            for workflow, _ in batch:
+                stored = counts.get(workflow.workflow_id, len(self.steps.get(workflow.workflow_id, ())))
+                if workflow.base_version > stored:
+                    raise WorkflowError(
+                        f"Missing steps {stored}-{workflow.base_version} of workflow {workflow.workflow_id}"
+                    )
+                if not workflow.is_delta and workflow.version < stored:
+                    stored = 0
+                counts[workflow.workflow_id] = max(stored, workflow.version)
+
+            for workflow, agent_id in batch:
+                steps = self.steps.setdefault(workflow.workflow_id, [])
+                if not workflow.is_delta and workflow.version < len(steps):
+                    steps.clear()
+                steps.extend(workflow.steps[len(steps) - workflow.base_version:])
+                self.workflows[workflow.workflow_id] = {
+                    'workflow_id': workflow.workflow_id,
+                    'metadata': workflow.metadata,
+                    'version': len(steps),
+                    'agent_id': agent_id,
+                    'created_at': now
+                }
+
+    def get_workflow(self, workflow_id: str, offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+        with self._lock:
+            header = self.workflows.get(workflow_id)
+            if header is None:
+                return None
+            end = None if limit is None else offset + limit
+            return {
+                'workflow_id': workflow_id,
+                'metadata': header['metadata'],
+                'version': header['version'],
+                'steps': self.steps[workflow_id][offset:end],
+                'base_version': offset
+            }
+
+    def save_tasks(self, batch: TaskBatch):
+        now = format_timestamp(datetime.now())
+        with self._lock:
+            for task, workflow_id, status, result in batch:
+                created_at = self.tasks.get(task.task_id, {}).get('created_at', now)
+                self.tasks[task.task_id] = {
+                    'task_id': task.task_id,
+                    'workflow_id': workflow_id,
+                    'status': status,
+                    'created_at': created_at,
+                    'completed_at': now if status in ('completed', 'failed') else None,
+                    'task': dict(task.__dict__),
+                    'result': result
+                }
+
+    def list_workflows(
+        self,
+        agent_id: Optional[str] = None,
+        since: Optional[Union[datetime, str]] = None,
+        until: Optional[Union[datetime, str]] = None,
+        limit: int = 100,
+        after: Optional[Tuple[str, str]] = None
+    ) -> Page:
+        since = format_timestamp(since) if since is not None else None
+        until = format_timestamp(until) if until is not None else None
+        with self._lock:
+            rows = [
+                dict(row) for row in self.workflows.values()
+                if (agent_id is None or row['agent_id'] == agent_id)
+                and (since is None or row['created_at'] >= since)
+                and (until is None or row['created_at'] < until)
+                and (after is None or _workflow_key(row) > tuple(after))
+            ]
+        return self._page(rows, _workflow_key, limit)
+
+    def list_tasks(
+        self,
+        status: Optional[str] = None,
+        workflow_id: Optional[str] = None,
+        limit: int = 100,
+        after: Optional[Tuple[str, str]] = None
+    ) -> Page:
+        with self._lock:
+            rows = [
+                dict(row) for row in self.tasks.values()
+                if (status is None or row['status'] == status)
+                and (workflow_id is None or row['workflow_id'] == workflow_id)
+                and (after is None or _task_key(row) > tuple(after))
+            ]
+        return self._page(rows, _task_key, limit)
+
+    def find_expired_workflows(
+        self,
+        older_than: Optional[Union[datetime, str]] = None,
+        max_per_agent: Optional[int] = None,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        cutoff = format_timestamp(older_than) if older_than is not None else None
+        with self._lock:
+            rows = [
+                {'workflow_id': row['workflow_id'], 'agent_id': row['agent_id'], 'created_at': row['created_at']}
+                for row in self.workflows.values()
+            ]
+        expired = {row['workflow_id']: row for row in rows if cutoff is not None and row['created_at'] < cutoff}
+        if max_per_agent is not None:
+            by_agent: Dict[str, List[Dict[str, Any]]] = {}
+            for row in rows:
+                by_agent.setdefault(row['agent_id'], []).append(row)
+            for agent_rows in by_agent.values():
+                agent_rows.sort(key=_workflow_key, reverse=True)
+                for row in agent_rows[max_per_agent:]:
+                    expired[row['workflow_id']] = row
+        return sorted(expired.values(), key=_workflow_key)[:limit]
+
+    def delete_workflows(self, workflow_ids: List[str]):
+        with self._lock:
+            removed = set(workflow_ids)
+            for workflow_id in removed:
+                self.workflows.pop(workflow_id, None)
+                self.steps.pop(workflow_id, None)
+            for task_id in [t for t, row in self.tasks.items() if row['workflow_id'] in removed]:
+                del self.tasks[task_id]
+
+    @staticmethod
+    def _page(rows: List[Dict[str, Any]], key, limit: int) -> Page:
+        rows = sorted(rows, key=key)[:limit]
+        cursor = key(rows[-1]) if len(rows) == limit else None
+        return rows, cursor
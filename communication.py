@@ -1,7 +1,8 @@
-from typing import Dict, Any, Callable
+from typing import Dict, Any, Callable, Optional
 import asyncio
 from dataclasses import dataclass
 from datetime import datetime
+from .tracing import tracer
 
 @dataclass
 class Message:
@@ -10,6 +11,8 @@ class Message:
     message_type: str
     content: Dict[str, Any]
     timestamp: datetime = datetime.now()
+    # W3C traceparent of the span that sent the message, if it was traced
+    trace_context: Optional[Dict[str, str]] = None
 
 class CommunicationBus:
     def __init__(self):
@@ -18,6 +21,8 @@ class CommunicationBus:
         
     async def send_message(self, message: Message):
         """Send a message to a specific agent"""
+        if message.trace_context is None:
+            message.trace_context = tracer.inject()
         if message.receiver_id not in self.channels:
             self.channels[message.receiver_id] = asyncio.Queue()
             
@@ -25,8 +30,10 @@ class CommunicationBus:
         
         # Notify subscribers
         if message.receiver_id in self.subscribers:
-            for callback in self.subscribers[message.receiver_id].values():
-                await callback(message)
+            # Callbacks join the sender's trace, even when the message came from another process
+            with tracer.span("bus.deliver", parent=tracer.extract(message.trace_context), receiver=message.receiver_id):
+                for callback in self.subscribers[message.receiver_id].values():
+                    await callback(message)
     
     def subscribe(self, agent_id: str, callback: Callable):
         """Subscribe to messages for a specific agent"""
@@ -0,0 +1,131 @@
+from typing import Callable, Dict, List, Optional, Tuple, Union
+import threading
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+class PayloadCodec:
+    """Compresses stored JSON payloads above a size threshold.
+
+    Uses zstd when the zstandard package is installed and zlib otherwise.
+    Once enough large payloads have been seen, a shared dictionary is trained
+    from them; it is persisted by the storage and referenced by the codec tag
+    written next to every row ('zlib', 'zstd:3', ...). Rows without a tag are
+    plain JSON text, so data written before compression stays readable.
+    A tag naming a dictionary this codec has not loaded, e.g. one trained by
+    another process sharing the database, is fetched with dictionary_loader.
+    """
+    def __init__(
+        self,
+        threshold: Optional[int] = 1024,
+        codec: Optional[str] = None,
+        level: int = 3,
+        dictionary_size: int = 32 * 1024,
+        train_after: int = 256,
+        dictionary_loader: Optional[Callable[[int], Optional[Tuple[str, bytes]]]] = None
+    ):
+        self.codec = codec or ('zstd' if zstandard is not None else 'zlib')
+        if self.codec == 'zstd' and zstandard is None:
+            raise ValueError("The zstd codec requires the zstandard package")
+        if self.codec not in ('zstd', 'zlib'):
+            raise ValueError(f"Unknown codec: {self.codec}")
+        self.threshold = threshold
+        self.level = level
+        self.dictionary_size = dictionary_size
+        self.train_after = train_after
+        self.dictionary_loader = dictionary_loader
+        self.dictionaries: Dict[int, Tuple[str, bytes]] = {}
+        self.active_dictionary: Optional[int] = None
+        self._samples: List[bytes] = []
+        self._local = threading.local()
+
+    def load_dictionary(self, dictionary_id: int, codec: str, data: bytes):
+        """Register a stored dictionary; the newest one for this codec is used for writes"""
+        self.dictionaries[dictionary_id] = (codec, data)
+        if codec == self.codec and (self.active_dictionary is None or dictionary_id > self.active_dictionary):
+            self.active_dictionary = dictionary_id
+            self._samples = []
+
+    @property
+    def ready_to_train(self) -> bool:
+        return self.active_dictionary is None and len(self._samples) >= self.train_after
+
+    def train(self) -> Optional[bytes]:
+        """Build a shared dictionary from the sampled payloads"""
+        samples, self._samples = self._samples, []
+        if self.codec == 'zstd':
+            try:
+                return zstandard.train_dictionary(self.dictionary_size, samples).as_bytes()
+            except zstandard.ZstdError:
+                return None
+        # zlib only looks back 32KB, and content nearest the end of zdict is cheapest to reference
+        return b''.join(samples)[-min(self.dictionary_size, 32 * 1024):]
+
+    def encode(self, payload: str) -> Tuple[Union[str, bytes], Optional[str]]:
+        """Return the value to store and its codec tag, or the payload itself and None"""
+        raw = payload.encode('utf-8')
+        if self.threshold is None or len(raw) < self.threshold:
+            return payload, None
+        if self.active_dictionary is None and len(self._samples) < self.train_after:
+            self._samples.append(raw)
+
+        tag = self.codec if self.active_dictionary is None else f"{self.codec}:{self.active_dictionary}"
+        compressed = self._compressor(tag)(raw)
+        if len(compressed) >= len(raw):
+            return payload, None
+        return compressed, tag
+
+    def decode(self, data: Union[str, bytes], tag: Optional[str]) -> str:
+        if tag is None:
+            return data
+        return self._decompressor(tag)(data).decode('utf-8')
+
+    def _dictionary(self, tag: str) -> Tuple[str, Optional[bytes]]:
+        codec, _, dictionary_id = tag.partition(':')
+        if not dictionary_id:
+            return codec, None
+        dictionary_id = int(dictionary_id)
+        if dictionary_id not in self.dictionaries:
+            stored = self.dictionary_loader(dictionary_id) if self.dictionary_loader is not None else None
+            if stored is None:
+                raise ValueError(f"Unknown compression dictionary {dictionary_id}")
+            # Only kept for decoding; writes stay on this codec's own active dictionary
+            self.dictionaries[dictionary_id] = (stored[0], stored[1])
+        return codec, self.dictionaries[dictionary_id][1]
+
+    def _compressor(self, tag: str):
+        codec, dictionary = self._dictionary(tag)
+        if codec == 'zstd':
+            # zstandard contexts are not thread-safe, so each thread keeps its own
+            cache = self._local.__dict__.setdefault('compressors', {})
+            if tag not in cache:
+                cache[tag] = zstandard.ZstdCompressor(
+                    level=self.level,
+                    dict_data=zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+                )
+            return cache[tag].compress
+
+        def compress(raw: bytes) -> bytes:
+            compressor = zlib.compressobj(self.level, zdict=dictionary) if dictionary else zlib.compressobj(self.level)
+            return compressor.compress(raw) + compressor.flush()
+        return compress
+
+    def _decompressor(self, tag: str):
+        codec, dictionary = self._dictionary(tag)
+        if codec == 'zstd':
+            if zstandard is None:
+                raise ValueError("Reading zstd rows requires the zstandard package")
+            cache = self._local.__dict__.setdefault('decompressors', {})
+            if tag not in cache:
+                cache[tag] = zstandard.ZstdDecompressor(
+                    dict_data=zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+                )
+            return cache[tag].decompress
+
+        def decompress(data: bytes) -> bytes:
+            decompressor = zlib.decompressobj(zdict=dictionary) if dictionary else zlib.decompressobj()
+            return decompressor.decompress(data) + decompressor.flush()
+        return decompress
@@ -1,9 +1,12 @@
 from typing import Dict, Any, List
 import asyncio
+from contextlib import asynccontextmanager
 from .agent_registry import AgentRegistry
+from .tracing import tracer
 from ..integration.agent_connector import AgentConnector
 from ..data.transformation_engine import DataTransformer, DataConsistencyManager
 from ..performance.optimization import PerformanceOptimizer, QueueManager
+from ..monitoring.profiler import profiler
 
 class EnhancedOrchestrator:
     def __init__(self, config: Dict[str, Any]):
@@ -19,47 +22,51 @@ class EnhancedOrchestrator:
         
     async def execute_workflow(self, workflow: Dict[str, Any]):
         """Execute a multi-agent workflow"""
-        try:
-            # Optimize task execution
-            tasks = workflow['tasks']
-            execution_groups = await self.optimizer.optimize_execution(tasks)
-            
-            results = []
-            for group in execution_groups:
-                # Execute tasks in parallel within each group
-                group_tasks = []
-                for task in group:
-                    # Ensure data consistency
-                    async with self._resource_lock(task):
-                        # Transform data if needed
-                        transformed_data = await self.transformer.transform_data(
-                            task['data'],
-                            task['source_agent'],
-                            task['target_agent']
-                        )
+        with tracer.span("workflow.execute", **{'workflow.id': workflow['id']}), profiler.tag(workflow=workflow['id']):
+            try:
+                # Optimize task execution
+                tasks = workflow['tasks']
+                with tracer.span("workflow.plan", tasks=len(tasks)):
+                    execution_groups = await self.optimizer.optimize_execution(tasks)
+                
+                results = []
+                for index, group in enumerate(execution_groups):
+                    with tracer.span("workflow.group", group=index, tasks=len(group)):
+                        # Execute tasks in parallel within each group
+                        group_tasks = []
+                        for task in group:
+                            # Ensure data consistency
+                            async with self._resource_lock(task):
+                                # Transform data if needed
+                                transformed_data = await self.transformer.transform_data(
+                                    task['data'],
+                                    task['source_agent'],
+                                    task['target_agent']
+                                )
+                                
+                                # Execute task with retries and rate limiting
+                                group_tasks.append(
+                                    self.connector.execute_with_retry(
+                                        task['agent_id'],
+                                        transformed_data
+                                    )
+                                )
                         
-                        # Execute task with retries and rate limiting
-                        group_tasks.append(
-                            self.connector.execute_with_retry(
-                                task['agent_id'],
-                                transformed_data
-                            )
+                        # Wait for all tasks in group to complete
+                        group_results = await asyncio.gather(
+                            *group_tasks,
+                            return_exceptions=True
                         )
+                        results.extend(group_results)
+                    
+                return results
                 
-                # Wait for all tasks in group to complete
-                group_results = await asyncio.gather(
-                    *group_tasks,
-                    return_exceptions=True
-                )
-                results.extend(group_results)
-                
-            return results
-            
-        except Exception as e:
-            # Handle failure cascade
-            await self._handle_failure_cascade(workflow['id'], str(e))
-            raise
+            except Exception as e:
+                # Handle failure cascade
+                await self._handle_failure_cascade(workflow['id'], str(e))
+                raise
             
+    @asynccontextmanager
     async def _resource_lock(self, task: Dict[str, Any]):
         """Context manager for resource locking"""
         resource_id = task.get('resource_id')
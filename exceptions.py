@@ -6,6 +6,10 @@ class WorkflowError(Exception):
     """Base exception for workflow-related errors"""
     pass
 
+class WorkflowResyncRequired(WorkflowError):
+    """A delta arrived for a workflow the receiver no longer holds; resend a full snapshot"""
+    pass
+
 class TaskError(Exception):
     """Base exception for task-related errors"""
     pass 
\ No newline at end of file
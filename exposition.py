@@ -0,0 +1,250 @@
+from typing import Dict, Any, Callable, Iterable, List, Optional, Tuple
+import asyncio
+import logging
+import time
+from .advanced_metrics import AdvancedMetricsCollector
+from .loop_monitor import LoopMonitor
+from .metrics import MetricsCollector
+from .quantiles import LatencyHistogram
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def escape_label(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{escape_label(value)}"' for key, value in labels.items()) + "}"
+
+def format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def family_header(name: str, metric_type: str, help_text: str) -> str:
+    return f"# HELP {name} {help_text}\n# TYPE {name} {metric_type}\n"
+
+def sample_line(name: str, labels: Dict[str, Any], value: float) -> str:
+    return f"{name}{format_labels(labels)} {format_value(value)}\n"
+
+def histogram_lines(
+    name: str,
+    labels: Dict[str, Any],
+    histogram: LatencyHistogram,
+    buckets: Iterable[float] = DEFAULT_BUCKETS
+) -> str:
+    """Render a LatencyHistogram as cumulative Prometheus buckets"""
+    lines = [
+        sample_line(f"{name}_bucket", dict(labels, le=format_value(bound)), histogram.count_at_or_below(bound))
+        for bound in buckets
+    ]
+    lines.append(sample_line(f"{name}_bucket", dict(labels, le="+Inf"), histogram.count))
+    lines.append(sample_line(f"{name}_sum", labels, histogram.total))
+    lines.append(sample_line(f"{name}_count", labels, histogram.count))
+    return "".join(lines)
+
+class AdvancedMetricsSource:
+    """Task throughput, outcomes, latency and resource usage from an AdvancedMetricsCollector.
+
+    Per-agent series keep the plain family names and per-task-type series
+    go in separate *_by_task_type families, so summing a family counts each
+    task once. Each series' lines are cached with the task count they were
+    rendered at, so a scrape only re-renders the series that changed.
+    """
+    def __init__(self, collector: AdvancedMetricsCollector, prefix: str = "orchestrator", buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.collector = collector
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self._chunks: Dict[Tuple[str, str], Tuple[int, str]] = {}
+
+    def render(self) -> str:
+        p = self.prefix
+        collector = self.collector
+        # (label, family name infix, stats, latency, resources)
+        label_sets = (
+            ('agent', '', collector.agent_stats, collector.agent_latency, collector.agent_resources),
+            ('task_type', '_by_task_type', collector.task_type_stats, collector.task_type_latency,
+             collector.task_type_resources)
+        )
+        # (name stem, name suffix, type, help, value); a None value renders the latency histogram
+        families = (
+            ("tasks", "_total", "counter", "Tasks finished", lambda s, resources: s.count),
+            ("task_successes", "_total", "counter", "Tasks that completed successfully",
+             lambda s, resources: s.successes),
+            ("task_errors", "_total", "counter", "Tasks that reported an error",
+             lambda s, resources: s.errors),
+            ("task_duration", "_seconds", "histogram", "Task duration in seconds", None),
+            ("task_cpu_seconds", "_total", "counter", "CPU seconds used by sampled tasks",
+             lambda s, resources: resources.cpu_seconds if resources else None),
+            ("task_resource_samples", "_total", "counter", "Tasks sampled for resource usage",
+             lambda s, resources: resources.samples if resources else None),
+        )
+
+        out: List[str] = []
+        for stem, suffix, metric_type, help_text, value_of in families:
+            for label, infix, stats, latency, resources in label_sets:
+                name = f"{p}_{stem}{infix}{suffix}"
+                out.append(family_header(name, metric_type, f"{help_text}, by {label.replace('_', ' ')}"))
+                for key, s in list(stats.items()):
+                    cached = self._chunks.get((name, key))
+                    if cached is None or cached[0] != s.count:
+                        labels = {label: key}
+                        if value_of is None:
+                            text = histogram_lines(name, labels, latency[key], self.buckets)
+                        else:
+                            value = value_of(s, resources.get(key))
+                            text = sample_line(name, labels, value) if value is not None else ""
+                        cached = (s.count, text)
+                        self._chunks[(name, key)] = cached
+                    out.append(cached[1])
+
+        out.append(family_header(f"{p}_tasks_in_flight", "gauge", "Tasks started but not finished"))
+        out.append(sample_line(f"{p}_tasks_in_flight", {}, len(collector.start_times)))
+        return "".join(out)
+
+class ExecutionCountSource:
+    """Per-agent execution counters from the basic MetricsCollector"""
+    def __init__(self, collector: MetricsCollector, prefix: str = "orchestrator"):
+        self.collector = collector
+        self.name = f"{prefix}_executions_total"
+
+    def render(self) -> str:
+        lines = [family_header(self.name, "counter", "Task executions recorded per agent")]
+        for agent_id, records in list(self.collector.metrics.items()):
+            lines.append(sample_line(self.name, {'agent': agent_id}, len(records)))
+        return "".join(lines)
+
+class StatsSource:
+    """Exposes the numeric values of a get_stats()-style dict as gauges, or counters where listed"""
+    def __init__(self, prefix: str, get_stats: Callable[[], Dict[str, Any]], counters: Iterable[str] = ()):
+        self.prefix = prefix
+        self.get_stats = get_stats
+        self.counters = set(counters)
+
+    def render(self) -> str:
+        lines = []
+        for key, value in self.get_stats().items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            if key in self.counters:
+                name = f"{self.prefix}_{key}_total"
+                lines.append(family_header(name, "counter", key.replace('_', ' ')))
+            else:
+                name = f"{self.prefix}_{key}"
+                lines.append(family_header(name, "gauge", key.replace('_', ' ')))
+            lines.append(sample_line(name, {}, value))
+        return "".join(lines)
+
+class LoopHealthSource:
+    """Loop lag, pending tasks and per-agent backlog from the latest LoopMonitor snapshot"""
+    def __init__(self, monitor: LoopMonitor, prefix: str = "orchestrator"):
+        self.monitor = monitor
+        self.prefix = prefix
+
+    def render(self) -> str:
+        snapshot = self.monitor.latest
+        if snapshot is None:
+            return ""
+        p = self.prefix
+        out = []
+        for key, help_text in (
+            ('loop_lag_seconds', "Event loop scheduling delay at the last tick"),
+            ('loop_lag_mean_seconds', "Mean event loop scheduling delay over the last interval"),
+            ('loop_lag_p99_seconds', "99th percentile event loop scheduling delay over the last interval"),
+            ('loop_lag_max_seconds', "Worst event loop scheduling delay over the last interval"),
+            ('pending_tasks', "Asyncio tasks not yet finished"),
+        ):
+            out.append(family_header(f"{p}_{key}", "gauge", help_text))
+            out.append(sample_line(f"{p}_{key}", {}, snapshot[key]))
+        out.append(family_header(f"{p}_slow_callbacks_total", "counter", "Times the event loop was blocked past the threshold"))
+        out.append(sample_line(f"{p}_slow_callbacks_total", {}, snapshot['slow_callbacks']))
+        out.append(family_header(f"{p}_mailbox_depth", "gauge", "Messages waiting in each agent's mailbox"))
+        for bus, depths in snapshot['mailbox_depths'].items():
+            for agent_id, depth in depths.items():
+                out.append(sample_line(f"{p}_mailbox_depth", {'bus': bus, 'agent': agent_id}, depth))
+        out.append(family_header(f"{p}_queue_backlog", "gauge", "Tasks queued for each agent"))
+        for agent_id, depth in snapshot['queue_backlog'].items():
+            out.append(sample_line(f"{p}_queue_backlog", {'agent': agent_id}, depth))
+        return "".join(out)
+
+class MetricsExporter:
+    """Serves registered metric sources at /metrics in the Prometheus text format.
+
+    Uses a bare asyncio server, so it runs on the application's own loop.
+    The body is cached for min_interval seconds, and rendering yields to the
+    loop between sources so a scrape never holds it for long.
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 9100, min_interval: float = 1.0):
+        self.host = host
+        self.port = port
+        self.min_interval = min_interval
+        self.sources: List[Any] = []
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.scrapes = 0
+        self._body: Optional[bytes] = None
+        self._rendered_at = 0.0
+        self._render_lock: Optional[asyncio.Lock] = None
+        self.logger = logging.getLogger(__name__)
+
+    def add_source(self, source):
+        """Register an object with a render() method returning Prometheus text"""
+        self.sources.append(source)
+        self._body = None
+
+    async def start(self):
+        self._render_lock = asyncio.Lock()
+        self.server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.logger.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    async def render(self) -> bytes:
+        if self._render_lock is None:
+            self._render_lock = asyncio.Lock()
+        # Concurrent scrapes share one render
+        async with self._render_lock:
+            now = time.monotonic()
+            if self._body is not None and now - self._rendered_at < self.min_interval:
+                return self._body
+            parts = []
+            for source in self.sources:
+                try:
+                    parts.append(source.render())
+                except Exception as e:
+                    self.logger.error(f"Metrics source {type(source).__name__} failed: {str(e)}")
+                await asyncio.sleep(0)
+            self._body = "".join(parts).encode('utf-8')
+            self._rendered_at = now
+            return self._body
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await reader.readline()
+            # Drain the headers; the request has no body we care about
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.decode('latin-1').split()
+            if len(parts) >= 2 and parts[0] in ("GET", "HEAD") and parts[1].split('?')[0] == "/metrics":
+                body = await self.render()
+                self.scrapes += 1
+                status, content_type = "200 OK", CONTENT_TYPE
+            else:
+                body, status, content_type = b"Not Found\n", "404 Not Found", "text/plain; charset=utf-8"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode('latin-1')
+            )
+            if parts and parts[0] != "HEAD":
+                writer.write(body)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
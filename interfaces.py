@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from dataclasses import dataclass
+from ..utils.exceptions import WorkflowError
 
 @dataclass
 class TaskData:
@@ -14,6 +15,56 @@ class WorkflowData:
     workflow_id: str
     steps: list[Dict[str, Any]]
     metadata: Dict[str, Any]
+    # Total number of steps in the workflow; steps holds those from base_version on
+    version: Optional[int] = None
+    base_version: int = 0
+
+    def __post_init__(self):
+        if self.version is None:
+            self.version = self.base_version + len(self.steps)
+
+    @property
+    def is_delta(self) -> bool:
+        return self.base_version > 0
+
+    def since(self, version: int) -> 'WorkflowData':
+        """Return the steps appended after version as a delta"""
+        if version < self.base_version:
+            raise WorkflowError(
+                f"Workflow {self.workflow_id} only holds steps from version {self.base_version}"
+            )
+        return WorkflowData(
+            workflow_id=self.workflow_id,
+            steps=self.steps[version - self.base_version:],
+            metadata=self.metadata,
+            version=self.version,
+            base_version=version
+        )
+
+    def copy(self) -> 'WorkflowData':
+        """Return a copy whose steps list can be extended independently"""
+        return WorkflowData(
+            workflow_id=self.workflow_id,
+            steps=list(self.steps),
+            metadata=self.metadata,
+            version=self.version,
+            base_version=self.base_version
+        )
+
+    def apply_delta(self, delta: 'WorkflowData') -> None:
+        """Merge a delta or full snapshot into this workflow in place"""
+        if not delta.is_delta:
+            self.steps = list(delta.steps)
+            self.base_version = 0
+            self.version = delta.version
+        elif delta.base_version > self.version:
+            raise WorkflowError(
+                f"Missing steps {self.version}-{delta.base_version} of workflow {self.workflow_id}"
+            )
+        elif delta.version > self.version:
+            self.steps.extend(delta.steps[self.version - delta.base_version:])
+            self.version = delta.version
+        self.metadata = delta.metadata
 
 class AgentInterface(ABC):
     """Standard interface that all agents must implement"""
@@ -24,11 +75,11 @@ class AgentInterface(ABC):
         pass
         
     @abstractmethod
-    def share_workflow(self) -> WorkflowData:
-        """Share current workflow data"""
+    def share_workflow(self, since_version: int = 0) -> WorkflowData:
+        """Share steps appended after since_version; 0 shares a full snapshot"""
         pass
         
     @abstractmethod
     def receive_workflow(self, workflow_data: WorkflowData) -> None:
-        """Process received workflow data"""
+        """Process received workflow data, which may be a delta"""
         pass 
\ No newline at end of file
@@ -0,0 +1,202 @@
+from typing import Dict, Any, Callable, List, Optional
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from .quantiles import LatencyHistogram
+
+class LoopMonitor:
+    """Samples event loop health and backlog, the leading indicators of saturation.
+
+    A heartbeat task wakes every tick_interval seconds; how late it wakes
+    is the loop's scheduling lag. A watchdog thread checks the heartbeat,
+    and when it is overdue by slow_callback_threshold it records the loop
+    thread's stack, i.e. the code holding the loop at that moment. Every
+    publish_interval seconds the monitor also counts pending tasks, the
+    depth of each watched CommunicationBus mailbox and each QueueManager
+    backlog, then hands the snapshot to the event bus topic and callbacks.
+    """
+    def __init__(
+        self,
+        tick_interval: float = 0.05,
+        slow_callback_threshold: float = 0.1,
+        publish_interval: float = 10.0,
+        event_bus=None,
+        topic: str = "loop_health",
+        max_slow_callbacks: int = 50
+    ):
+        self.tick_interval = tick_interval
+        self.slow_callback_threshold = slow_callback_threshold
+        self.publish_interval = publish_interval
+        self.event_bus = event_bus
+        self.topic = topic
+        self.callbacks: List[Callable[[Dict[str, Any]], None]] = []
+        self.buses: Dict[str, Any] = {}
+        self.queue_managers: List[Any] = []
+        self.slow_callbacks: deque = deque(maxlen=max_slow_callbacks)
+        self.slow_callback_count = 0
+        self.latest: Optional[Dict[str, Any]] = None
+        self._lag = LatencyHistogram()
+        self._last_lag = 0.0
+        self._heartbeat = time.monotonic()
+        self._blocked: Optional[Dict[str, Any]] = None
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._publish_task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def watch_bus(self, name: str, bus):
+        """Report the mailbox depth of every agent on a CommunicationBus"""
+        self.buses[name] = bus
+
+    def watch_queue_manager(self, queue_manager):
+        """Report the backlog of every agent queue held by a QueueManager"""
+        self.queue_managers.append(queue_manager)
+
+    def add_callback(self, callback: Callable[[Dict[str, Any]], None]):
+        """Call callback with each published snapshot, e.g. to drive autoscaling"""
+        self.callbacks.append(callback)
+
+    def start(self):
+        """Start monitoring the running loop; call from a coroutine on that loop"""
+        if self._task is not None:
+            return
+        self._loop_thread = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stop.set()
+        for task in (self._task, self._publish_task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = None
+        self._publish_task = None
+        self._watchdog.join()
+        self._watchdog = None
+
+    async def _run(self):
+        next_publish = time.monotonic() + self.publish_interval
+        while True:
+            scheduled = time.monotonic()
+            await asyncio.sleep(self.tick_interval)
+            now = time.monotonic()
+            lag = max(0.0, now - scheduled - self.tick_interval)
+            with self._lock:
+                self._heartbeat = now
+                self._blocked = None
+                self._last_lag = lag
+                self._lag.record(lag)
+            # Published in a task of its own: awaiting Redis here would stall the heartbeat
+            if now >= next_publish and (self._publish_task is None or self._publish_task.done()):
+                next_publish = now + self.publish_interval
+                self._publish_task = asyncio.ensure_future(self._publish_logged())
+
+    async def _publish_logged(self):
+        try:
+            await self.publish()
+        except Exception as e:
+            self.logger.error(f"Loop health publish failed: {str(e)}")
+
+    def _watch(self):
+        while not self._stop.wait(self.slow_callback_threshold / 2):
+            with self._lock:
+                heartbeat = self._heartbeat
+                blocked = time.monotonic() - heartbeat - self.tick_interval
+                if blocked < self.slow_callback_threshold:
+                    continue
+                if self._blocked is not None:
+                    # Still the same stall; keep its duration current
+                    self._blocked['blocked_seconds'] = blocked
+                    continue
+                frame = sys._current_frames().get(self._loop_thread)
+                stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+                del frame
+                self._blocked = {'detected_at': time.time(), 'blocked_seconds': blocked, 'stack': stack}
+                self.slow_callbacks.append(self._blocked)
+                self.slow_callback_count += 1
+            self.logger.warning(
+                f"Event loop blocked for over {self.slow_callback_threshold:.3f}s in:\n{stack}"
+            )
+
+    def mailbox_depths(self) -> Dict[str, Dict[str, int]]:
+        return {
+            name: {agent_id: queue.qsize() for agent_id, queue in list(bus.channels.items())}
+            for name, bus in self.buses.items()
+        }
+
+    async def queue_backlog(self) -> Dict[str, int]:
+        """Tasks waiting per agent, in local queues and in Redis"""
+        backlog: Dict[str, int] = {}
+        for queue_manager in self.queue_managers:
+            for agent_id, queue in list(queue_manager.queues.items()):
+                backlog[agent_id] = backlog.get(agent_id, 0) + queue.qsize()
+            try:
+                async for key in queue_manager.redis.scan_iter(match="queue:*"):
+                    key = key.decode() if isinstance(key, bytes) else key
+                    agent_id = key.split(':', 1)[1]
+                    backlog[agent_id] = backlog.get(agent_id, 0) + await queue_manager.redis.zcard(key)
+            except Exception as e:
+                self.logger.warning(f"Could not read queue backlog from Redis: {str(e)}")
+        return backlog
+
+    async def snapshot(self) -> Dict[str, Any]:
+        """Measure backlog now and summarise loop lag since the previous snapshot"""
+        with self._lock:
+            lag, self._lag = self._lag, LatencyHistogram()
+            last_lag = self._last_lag
+            slow_callbacks = list(self.slow_callbacks)
+            self.slow_callbacks.clear()
+            slow_callback_count = self.slow_callback_count
+        mailboxes = self.mailbox_depths()
+        queues = await self.queue_backlog()
+        return {
+            'timestamp': time.time(),
+            'loop_lag_seconds': last_lag,
+            'loop_lag_mean_seconds': lag.mean,
+            'loop_lag_p99_seconds': lag.quantile(0.99),
+            'loop_lag_max_seconds': lag.max or 0.0,
+            'pending_tasks': len(asyncio.all_tasks()),
+            'slow_callbacks': slow_callback_count,
+            'recent_slow_callbacks': slow_callbacks,
+            'mailbox_depths': mailboxes,
+            'mailbox_depth_total': sum(sum(depths.values()) for depths in mailboxes.values()),
+            'queue_backlog': queues,
+            'queue_backlog_total': sum(queues.values())
+        }
+
+    async def publish(self) -> Dict[str, Any]:
+        snapshot = await self.snapshot()
+        self.latest = snapshot
+        if self.event_bus is not None:
+            self.event_bus.publish(self.topic, snapshot)
+        for callback in self.callbacks:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                self.logger.error(f"Loop health callback failed: {str(e)}")
+        return snapshot
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Scalar values of the latest snapshot, for StatsSource-style consumers"""
+        if self.latest is None:
+            return {}
+        return {
+            key: value for key, value in self.latest.items()
+            if key != 'timestamp' and isinstance(value, (int, float))
+        }
@@ -5,11 +5,16 @@ from examples.sample_agents import SimpleAgent
 from src.agents.specialized_agents import AIAgent, DataProcessingAgent
 from src.managers.advanced_collaboration import AdvancedCollaborationManager
 from src.monitoring.advanced_metrics import AdvancedMetricsCollector
+from src.monitoring.exposition import MetricsExporter, AdvancedMetricsSource, StatsSource, LoopHealthSource
+from src.monitoring.loop_monitor import LoopMonitor
 from src.storage.persistence import WorkflowStorage
+from src.storage.async_storage import AsyncWorkflowStorage
 from src.managers.workflow_sharing import WorkflowSharingManager
+from src.managers.workflow_cache import WorkflowCache
+from src.utils.exceptions import WorkflowResyncRequired
 import logging
 import asyncio
-from typing import List
+from typing import Dict, List, Optional
 from dataclasses import dataclass
 
 @dataclass
@@ -20,23 +25,69 @@ class AgentCapability:
     max_concurrent_tasks: int
 
 class OrchestrationSystem:
-    def __init__(self):
+    def __init__(self, metrics_port: Optional[int] = None):
         self.orchestrator = AgentOrchestrator()
         self.metrics_collector = AdvancedMetricsCollector()
         self.workflow_storage = WorkflowStorage()
-        self.workflow_sharing = WorkflowSharingManager(self.orchestrator.observation_bus)
+        # All database I/O runs off the event loop; per-task saves are fire-and-forget
+        self.async_storage = AsyncWorkflowStorage(self.workflow_storage)
+        self.write_behind = self.async_storage.writer
+        self.workflow_cache = WorkflowCache(storage=self.write_behind, executor=self.async_storage.read_executor)
+        self.workflow_sharing = WorkflowSharingManager(
+            self.orchestrator.observation_bus,
+            coalesce_window=0.05,
+            coalesce_max_updates=10,
+            workflow_cache=self.workflow_cache
+        )
+        self.shared_versions: Dict[str, int] = {}
+        # Loop lag and mailbox backlog, published on the observation bus as 'loop_health'
+        self.loop_monitor = LoopMonitor(event_bus=self.orchestrator.observation_bus)
+        self.loop_monitor.watch_bus("agents", self.orchestrator.communication_bus)
+        # Prometheus scrape endpoint, only served when a port is given
+        self.metrics_port = metrics_port
+        self.exporter = MetricsExporter(port=metrics_port or 0)
+        self.exporter.add_source(AdvancedMetricsSource(self.metrics_collector))
+        self.exporter.add_source(StatsSource(
+            "orchestrator_workflow_cache", self.workflow_cache.get_stats, counters=('hits', 'misses', 'evictions')
+        ))
+        self.exporter.add_source(StatsSource(
+            "orchestrator_write_behind", self.write_behind.get_stats,
+            counters=('batches_written', 'records_written', 'write_errors')
+        ))
+        self.exporter.add_source(StatsSource(
+            "orchestrator_workflow_sharing", self.workflow_sharing.get_coalesce_stats,
+            counters=('updates_received', 'workflow_flushes', 'notifications_sent', 'publishes')
+        ))
+        self.exporter.add_source(LoopHealthSource(self.loop_monitor))
 
     async def execute_task_with_agent(self, agent_id: str, task: TaskData):
         self.metrics_collector.start_task_monitoring(task.task_id, agent_id)
         result = await self.orchestrator.execute_task(agent_id, task)
-        self.metrics_collector.end_task_monitoring(task.task_id, agent_id, result)
+        self.metrics_collector.end_task_monitoring(task.task_id, agent_id, result, task.task_type)
         
-        workflow = self.orchestrator.agents[agent_id]['interface'].share_workflow()
-        self.workflow_storage.save_workflow(workflow, agent_id)
-        await self.workflow_sharing.share_workflow(workflow, agent_id)
+        # Pull only the steps added since this agent's last share
+        interface = self.orchestrator.agents[agent_id]['interface']
+        workflow = interface.share_workflow(self.shared_versions.get(agent_id, 0))
+        try:
+            await self.workflow_sharing.share_workflow(workflow, agent_id)
+        except WorkflowResyncRequired:
+            # The cache lost the workflow, so the delta has nothing to apply to
+            workflow = interface.share_workflow(0)
+            await self.workflow_sharing.share_workflow(workflow, agent_id)
+        self.shared_versions[agent_id] = workflow.version
+        # Waits for queue space without blocking the loop when the writer falls behind
+        await self.write_behind.submit_workflow_async(
+            self.workflow_sharing.get_cached_workflow(workflow.workflow_id),
+            agent_id
+        )
+        await self.write_behind.submit_task_async(task, workflow.workflow_id, result.get('status'), result)
         return result
 
     async def run_system(self):
+        self.loop_monitor.start()
+        if self.metrics_port is not None:
+            await self.exporter.start()
+
         # Register specialized agents
         ai_agent = AIAgent("gpt-4", "your-api-key")
         data_agent = DataProcessingAgent("data-processing")
@@ -62,10 +113,14 @@ class OrchestrationSystem:
         for agent_id, agent_tasks in assignments.items():
             for task in agent_tasks:
                 await self.execute_task_with_agent(agent_id, task)
+        await self.workflow_sharing.flush()
+        await self.async_storage.flush()
         
         # Generate performance report
         performance_report = self.metrics_collector.generate_performance_report()
         print("Performance Report:", performance_report)
+        await self.exporter.close()
+        await self.loop_monitor.stop()
 
 def main():
     # Configure basic logging
@@ -1,23 +1,46 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
 from collections import defaultdict
 from datetime import datetime
 import json
+import threading
+from .sinks import JsonLinesSink
 
 class MetricsCollector:
-    def __init__(self):
+    def __init__(self, sink: Optional[JsonLinesSink] = None, keep_recent: int = 100):
         self.metrics: Dict[str, List[Dict]] = defaultdict(list)
+        # With a sink, records are durable once flushed and only the newest keep_recent per agent stay in memory
+        self.sink = sink
+        self.keep_recent = keep_recent
+        self._lock = threading.Lock()
+        if sink is not None:
+            sink.on_flush = self._trim
         
     def record_execution(self, agent_id: str, task_id: str) -> None:
         """Record task execution metrics"""
-        self.metrics[agent_id].append({
+        record = {
             'task_id': task_id,
             'timestamp': datetime.now().isoformat(),
             'status': 'completed'
-        })
+        }
+        with self._lock:
+            self.metrics[agent_id].append(record)
+        if self.sink is not None:
+            self.sink.write(dict(record, agent_id=agent_id))
         
     def get_agent_metrics(self, agent_id: str) -> List[Dict]:
         """Get metrics for specific agent"""
         return self.metrics.get(agent_id, [])
+
+    def flush(self) -> None:
+        """Write buffered records to the sink and trim the in-memory history"""
+        if self.sink is not None:
+            self.sink.flush()
+
+    def _trim(self, flushed: int) -> None:
+        with self._lock:
+            for records in self.metrics.values():
+                if len(records) > self.keep_recent:
+                    del records[:len(records) - self.keep_recent]
         
     def export_metrics(self, file_path: str) -> None:
         """Export metrics to JSON file"""
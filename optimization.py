@@ -1,9 +1,11 @@
 from typing import Dict, Any, List, Optional
 import asyncio
+import time
 from collections import defaultdict
 import networkx as nx
 import json
 from redis import asyncio as aioredis
+from ..core.tracing import tracer
 
 class PerformanceOptimizer:
     def __init__(self):
@@ -49,6 +51,10 @@ class QueueManager:
     async def enqueue_task(self, agent_id: str, task: Dict[str, Any]):
         """Enqueue task with priority"""
         priority = task.get('priority', 0)
+        # Carry the trace and enqueue time so the consumer can record the queue wait
+        trace_context = tracer.inject()
+        if trace_context is not None:
+            task = dict(task, _trace=trace_context, _enqueued_at=time.time_ns())
         await self.redis.zadd(
             f"queue:{agent_id}",
             {json.dumps(task): priority}
@@ -58,5 +64,13 @@ class QueueManager:
         """Dequeue highest priority task"""
         task = await self.redis.zpopmax(f"queue:{agent_id}")
         if task:
-            return json.loads(task[0][0])
+            task = json.loads(task[0][0])
+            trace_context = task.pop('_trace', None)
+            enqueued_at = task.pop('_enqueued_at', None)
+            if trace_context is not None and enqueued_at is not None:
+                tracer.record_span(
+                    "queue.wait", enqueued_at, time.time_ns(),
+                    parent=tracer.extract(trace_context), agent_id=agent_id
+                )
+            return task
         return None 
\ No newline at end of file
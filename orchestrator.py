@@ -4,6 +4,7 @@ from .interfaces import AgentInterface, TaskData, WorkflowData
 from .event_bus import EventBus
 from ..utils.exceptions import AgentError
 from ..monitoring.metrics import MetricsCollector
+from ..monitoring.profiler import profiler
 import logging
 from .communication import CommunicationBus, Message
 from .agent_registry import AgentRegistry
@@ -69,10 +70,11 @@ class AgentOrchestrator:
         try:
             self.agents[agent_id]['status'] = 'busy'
             # If the agent's execute_task is async, await it
-            if hasattr(self.agents[agent_id]['interface'], 'execute_task'):
-                result = await self.agents[agent_id]['interface'].execute_task(task)
-            else:
-                result = self.agents[agent_id]['interface'].execute_task(task)
+            with profiler.tag(agent=agent_id, task=task.task_id):
+                if hasattr(self.agents[agent_id]['interface'], 'execute_task'):
+                    result = await self.agents[agent_id]['interface'].execute_task(task)
+                else:
+                    result = self.agents[agent_id]['interface'].execute_task(task)
             
             self.metrics.record_execution(agent_id, task.task_id)
             return result
@@ -1,16 +1,356 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Iterator, Optional, Tuple, Union
+from abc import ABC, abstractmethod
+import gzip
 import json
+import os
+import queue
 import sqlite3
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from ..core.interfaces import WorkflowData, TaskData
+from ..core.tracing import tracer
+from ..utils.exceptions import WorkflowError
+from .compression import PayloadCodec
 
-class WorkflowStorage:
-    def __init__(self, db_path: str = "workflows.db"):
+def format_timestamp(value: Union[datetime, str]) -> str:
+    """Timestamps are stored as ISO 8601 text so they sort and compare as strings"""
+    return value.isoformat(' ') if isinstance(value, datetime) else value
+
+# Statements are module constants so each connection's statement cache reuses them
+SELECT_WORKFLOW_DATA = "SELECT data, codec FROM workflows WHERE workflow_id = ?"
+UPSERT_WORKFLOW = """
+    INSERT INTO workflows (workflow_id, agent_id, created_at, data, codec)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (workflow_id) DO UPDATE SET
+        agent_id = excluded.agent_id,
+        created_at = excluded.created_at,
+        data = excluded.data,
+        codec = excluded.codec
+"""
+INSERT_STEP = "INSERT OR REPLACE INTO workflow_steps (workflow_id, seq, data, codec) VALUES (?, ?, ?, ?)"
+SELECT_STEP_COUNT = "SELECT COALESCE(MAX(seq) + 1, 0) FROM workflow_steps WHERE workflow_id = ?"
+TRUNCATE_STEPS = "DELETE FROM workflow_steps WHERE workflow_id = ? AND seq >= ?"
+SELECT_STEPS = """
+    SELECT data, codec FROM workflow_steps
+    WHERE workflow_id = ? AND seq >= ?
+    ORDER BY seq
+    LIMIT ?
+"""
+UPSERT_TASK = """
+    INSERT INTO tasks (task_id, workflow_id, status, created_at, completed_at, data, codec)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (task_id) DO UPDATE SET
+        workflow_id = excluded.workflow_id,
+        status = excluded.status,
+        completed_at = excluded.completed_at,
+        data = excluded.data,
+        codec = excluded.codec
+"""
+
+# PRAGMA user_version once embedded step lists have been moved into workflow_steps
+STEP_TABLE_SCHEMA_VERSION = 1
+
+def _open_records(path: str, mode: str):
+    """Open a JSON lines file for text I/O, gzip-compressed when the name ends in .gz"""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+WorkflowBatch = List[Tuple[WorkflowData, str]]
+TaskBatch = List[Tuple[TaskData, str, str, Dict[str, Any]]]
+# A page of rows plus the keyset cursor for the next page, or None at the end
+Page = Tuple[List[Dict[str, Any]], Optional[Tuple[str, str]]]
+
+class StorageBackend(ABC):
+    """Interface implemented by every workflow storage backend"""
+    read_pool_size = 4
+
+    @abstractmethod
+    def save_workflows(self, batch: WorkflowBatch):
+        """Insert or update many workflows in a single transaction"""
+        pass
+
+    @abstractmethod
+    def get_workflow(self, workflow_id: str, offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Reassemble a workflow, optionally returning only a page of its steps"""
+        pass
+
+    @abstractmethod
+    def save_tasks(self, batch: TaskBatch):
+        """Insert or update many task results in a single transaction"""
+        pass
+
+    @abstractmethod
+    def list_workflows(
+        self,
+        agent_id: Optional[str] = None,
+        since: Optional[Union[datetime, str]] = None,
+        until: Optional[Union[datetime, str]] = None,
+        limit: int = 100,
+        after: Optional[Tuple[str, str]] = None
+    ) -> Page:
+        """List workflow headers by agent and/or time range, oldest first"""
+        pass
+
+    @abstractmethod
+    def list_tasks(
+        self,
+        status: Optional[str] = None,
+        workflow_id: Optional[str] = None,
+        limit: int = 100,
+        after: Optional[Tuple[str, str]] = None
+    ) -> Page:
+        """List tasks by status and/or workflow, oldest first"""
+        pass
+
+    @abstractmethod
+    def find_expired_workflows(
+        self,
+        older_than: Optional[Union[datetime, str]] = None,
+        max_per_agent: Optional[int] = None,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """Return workflows older than a cutoff or beyond the newest max_per_agent of their agent"""
+        pass
+
+    @abstractmethod
+    def delete_workflows(self, workflow_ids: List[str]):
+        """Delete workflows with their steps and tasks"""
+        pass
+
+    def save_workflow(self, workflow: WorkflowData, agent_id: str):
+        self.save_workflows([(workflow, agent_id)])
+
+    def save_task(self, task: TaskData, workflow_id: str, status: str, result: Dict[str, Any]):
+        self.save_tasks([(task, workflow_id, status, result)])
+
+    def incremental_vacuum(self, pages: int = 256) -> int:
+        """Give free space back to the filesystem, returning how much remains free"""
+        return 0
+
+    def incremental_vacuum_enabled(self) -> bool:
+        """Whether incremental_vacuum can free anything; False until enable_incremental_vacuum runs"""
+        return True
+
+    def enable_incremental_vacuum(self):
+        pass
+
+    def export_workflows(self, path: str, page_size: int = 100, step_page_size: int = 1000, **filters) -> int:
+        """Stream workflows matching list_workflows filters, with their steps and tasks, to a file.
+
+        Records are written as JSON lines, gzip-compressed when path ends in
+        .gz. Each workflow is a 'workflow' record holding its header and first
+        page of steps, followed by 'steps' records for the remaining pages and
+        a 'task' record per task, so memory use does not grow with the data.
+        Returns the number of workflows exported.
+        """
+        exported = 0
+        with _open_records(path, 'w') as out:
+            page, cursor = self.list_workflows(limit=page_size, **filters)
+            while page:
+                for header in page:
+                    self._export_workflow(out, header, page_size, step_page_size)
+                    exported += 1
+                if cursor is None:
+                    break
+                page, cursor = self.list_workflows(limit=page_size, after=cursor, **filters)
+        return exported
+
+    def _export_workflow(self, out, header: Dict[str, Any], page_size: int, step_page_size: int):
+        workflow_id = header['workflow_id']
+        offset = 0
+        while True:
+            workflow = self.get_workflow(workflow_id, offset, step_page_size)
+            if workflow is None:
+                # Deleted since it was listed
+                return
+            if offset == 0:
+                record = {
+                    'type': 'workflow',
+                    'workflow_id': workflow_id,
+                    'agent_id': header['agent_id'],
+                    'created_at': header['created_at'],
+                    'metadata': workflow['metadata'],
+                    'version': workflow['version'],
+                    'steps': workflow['steps']
+                }
+            else:
+                record = {'type': 'steps', 'workflow_id': workflow_id, 'base_version': offset, 'steps': workflow['steps']}
+            out.write(json.dumps(record, default=str) + "\n")
+            offset += len(workflow['steps'])
+            if len(workflow['steps']) < step_page_size or offset >= workflow['version']:
+                break
+
+        tasks, cursor = self.list_tasks(workflow_id=workflow_id, limit=page_size)
+        while tasks:
+            for task in tasks:
+                out.write(json.dumps(dict(task, type='task'), default=str) + "\n")
+            if cursor is None:
+                break
+            tasks, cursor = self.list_tasks(workflow_id=workflow_id, limit=page_size, after=cursor)
+
+    def import_workflows(self, path: str, batch_size: int = 500, resume: bool = True) -> int:
+        """Load a file written by export_workflows, committing every batch_size records.
+
+        Progress is checkpointed to path + '.progress' after each batch, so an
+        interrupted import picks up from the last committed batch. Replaying a
+        batch is harmless: workflows are rewritten from their first record and
+        tasks are upserts. Imported workflows replace existing ones with the
+        same id and are stamped with the import time. Returns the number of
+        records imported by this call.
+        """
+        progress_path = path + '.progress'
+        done = 0
+        if resume and os.path.exists(progress_path):
+            with open(progress_path) as f:
+                done = int(f.read().strip() or 0)
+
+        workflows: WorkflowBatch = []
+        tasks: TaskBatch = []
+        imported = 0
+        line_number = 0
+        # Step pages only carry the workflow id, so the header of the current workflow is kept
+        header: Dict[str, Any] = {}
+        with _open_records(path, 'r') as records:
+            for line_number, line in enumerate(records, 1):
+                record = json.loads(line)
+                if record['type'] == 'workflow':
+                    header = record
+                if line_number <= done:
+                    continue
+                if record['type'] == 'workflow':
+                    workflows.append((
+                        WorkflowData(workflow_id=record['workflow_id'], steps=record['steps'], metadata=record['metadata']),
+                        record['agent_id']
+                    ))
+                elif record['type'] == 'steps':
+                    workflows.append((
+                        WorkflowData(
+                            workflow_id=record['workflow_id'],
+                            steps=record['steps'],
+                            metadata=header['metadata'],
+                            base_version=record['base_version']
+                        ),
+                        header['agent_id']
+                    ))
+                else:
+                    tasks.append((TaskData(**record['task']), record['workflow_id'], record['status'], record['result']))
+                imported += 1
+                if len(workflows) + len(tasks) >= batch_size:
+                    self._import_batch(workflows, tasks, progress_path, line_number)
+                    workflows, tasks = [], []
+        self._import_batch(workflows, tasks, progress_path, line_number)
+        if os.path.exists(progress_path):
+            os.remove(progress_path)
+        return imported
+
+    def _import_batch(self, workflows: WorkflowBatch, tasks: TaskBatch, progress_path: str, line_number: int):
+        # Workflows first, so a task is never stored ahead of its workflow
+        if workflows:
+            self.save_workflows(workflows)
+        if tasks:
+            self.save_tasks(tasks)
+        with open(progress_path + '.tmp', 'w') as f:
+            f.write(str(line_number))
+        os.replace(progress_path + '.tmp', progress_path)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+class WorkflowStorage(StorageBackend):
+    """Single-file SQLite backend"""
+    def __init__(
+        self,
+        db_path: str = "workflows.db",
+        read_pool_size: int = 4,
+        cache_size_kib: int = 16384,
+        cached_statements: int = 256,
+        compress_threshold: Optional[int] = 1024
+    ):
         self.db_path = db_path
+        self.read_pool_size = read_pool_size
+        self.cache_size_kib = cache_size_kib
+        self.cached_statements = cached_statements
+        # Payloads of at least compress_threshold bytes are stored compressed; None disables it
+        self.codec = PayloadCodec(compress_threshold, dictionary_loader=self._load_dictionary)
+        # A single long-lived writer plus a pool of read-only connections
+        self._in_memory = db_path == ":memory:"
+        self._write_lock = threading.RLock()
+        self._writer = self._connect()
+        self._readers: queue.Queue = queue.Queue()
         self._initialize_db()
 
+    def _connect(self, read_only: bool = False) -> sqlite3.Connection:
+        if read_only:
+            conn = sqlite3.connect(
+                f"file:{self.db_path}?mode=ro",
+                uri=True,
+                check_same_thread=False,
+                cached_statements=self.cached_statements
+            )
+            conn.execute("PRAGMA query_only = ON")
+        else:
+            conn = sqlite3.connect(
+                self.db_path,
+                check_same_thread=False,
+                cached_statements=self.cached_statements
+            )
+            # Only takes effect on a new database; see enable_incremental_vacuum
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            if not self._in_memory:
+                conn.execute("PRAGMA journal_mode = WAL")
+            # WAL makes NORMAL durable against application crashes; only power loss can drop the last commits
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute(f"PRAGMA cache_size = -{int(self.cache_size_kib)}")
+        conn.execute("PRAGMA busy_timeout = 5000")
+        return conn
+
+    @contextmanager
+    def _write_connection(self) -> Iterator[sqlite3.Connection]:
+        """Run a write transaction on the shared writer connection"""
+        with self._write_lock:
+            with self._writer:
+                yield self._writer
+            # Only after the commit, so a rolled-back transaction can't take an active dictionary with it
+            self._store_trained_dictionary()
+
+    @contextmanager
+    def _read_connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a read-only connection from the pool"""
+        if self._in_memory:
+            # An in-memory database is private to the writer connection
+            with self._write_lock:
+                yield self._writer
+            return
+
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            conn = self._connect(read_only=True)
+        try:
+            yield conn
+        finally:
+            if self._readers.qsize() < self.read_pool_size:
+                self._readers.put(conn)
+            else:
+                conn.close()
+
+    def close(self):
+        while not self._readers.empty():
+            self._readers.get_nowait().close()
+        with self._write_lock:
+            self._writer.close()
+
     def _initialize_db(self):
-        with sqlite3.connect(self.db_path) as conn:
+        with self._write_connection() as conn:
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS workflows (
                     workflow_id TEXT PRIMARY KEY,
@@ -19,7 +359,7 @@ class WorkflowStorage:
                     data JSON
                 )
             """)
-            
+
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS tasks (
                     task_id TEXT PRIMARY KEY,
@@ -32,49 +372,321 @@ class WorkflowStorage:
                 )
             """)
 
-    def save_workflow(self, workflow: WorkflowData, agent_id: str):
-        with sqlite3.connect(self.db_path) as conn:
-            # Check if workflow exists
-            cursor = conn.execute(
-                "SELECT workflow_id FROM workflows WHERE workflow_id = ?",
-                (workflow.workflow_id,)
+            # Steps only ever grow, so each one is stored once as its own row
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS workflow_steps (
+                    workflow_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    data JSON,
+                    PRIMARY KEY (workflow_id, seq)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS compression_dictionaries (
+                    dictionary_id INTEGER PRIMARY KEY,
+                    codec TEXT NOT NULL,
+                    data BLOB NOT NULL
+                )
+            """)
+            # Rows written before compression have no codec and are read as plain JSON
+            for table in ('workflows', 'tasks', 'workflow_steps'):
+                columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+                if 'codec' not in columns:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN codec TEXT")
+            for dictionary_id, codec, data in conn.execute(
+                "SELECT dictionary_id, codec, data FROM compression_dictionaries ORDER BY dictionary_id"
+            ):
+                self.codec.load_dictionary(dictionary_id, codec, data)
+            # The migration scans every workflow row, so it only runs until it has completed once
+            if conn.execute("PRAGMA user_version").fetchone()[0] < STEP_TABLE_SCHEMA_VERSION:
+                self._migrate_step_blobs(conn)
+                conn.execute(f"PRAGMA user_version = {STEP_TABLE_SCHEMA_VERSION}")
+
+            # Keyset pagination orders by (created_at, id), so each index ends with the key
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_workflows_agent_created ON workflows (agent_id, created_at, workflow_id)"
             )
-            
-            if cursor.fetchone():
-                # Update existing workflow
-                conn.execute(
-                    """
-                    UPDATE workflows 
-                    SET data = ?, agent_id = ?, created_at = ?
-                    WHERE workflow_id = ?
-                    """,
-                    (
-                        json.dumps(workflow.__dict__),
-                        agent_id,
-                        datetime.now(),
-                        workflow.workflow_id
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_workflows_created ON workflows (created_at, workflow_id)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_tasks_workflow_status ON tasks (workflow_id, status)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_tasks_status_created ON tasks (status, created_at, task_id)"
+            )
+
+    def _migrate_step_blobs(self, conn: sqlite3.Connection):
+        """Move steps embedded in workflow rows written by older versions into workflow_steps"""
+        rows = conn.execute(
+            "SELECT workflow_id, data FROM workflows "
+            "WHERE codec IS NULL AND json_extract(data, '$.steps') IS NOT NULL"
+        ).fetchall()
+        for workflow_id, data in rows:
+            header = json.loads(data)
+            steps = header.pop('steps')
+            header['version'] = len(steps)
+            header.pop('base_version', None)
+            conn.executemany(
+                INSERT_STEP,
+                [(workflow_id, seq, *self._encode(step)) for seq, step in enumerate(steps)]
+            )
+            conn.execute(
+                "UPDATE workflows SET data = ?, codec = ? WHERE workflow_id = ?",
+                (*self._encode(header), workflow_id)
+            )
+
+    def _encode(self, value: Any) -> Tuple[Any, Optional[str]]:
+        """Serialise a value for storage, returning the stored form and its codec tag"""
+        return self.codec.encode(json.dumps(value, default=str))
+
+    def _store_trained_dictionary(self):
+        """Train a dictionary once enough samples are in, committing it before rows may reference it"""
+        if not self.codec.ready_to_train:
+            return
+        dictionary = self.codec.train()
+        if not dictionary:
+            return
+        with self._writer:
+            cursor = self._writer.execute(
+                "INSERT INTO compression_dictionaries (codec, data) VALUES (?, ?)",
+                (self.codec.codec, dictionary)
+            )
+        self.codec.load_dictionary(cursor.lastrowid, self.codec.codec, dictionary)
+
+    def _load_dictionary(self, dictionary_id: int) -> Optional[Tuple[str, bytes]]:
+        """Fetch a dictionary another WorkflowStorage on the same file trained after this one opened"""
+        with self._read_connection() as conn:
+            return conn.execute(
+                "SELECT codec, data FROM compression_dictionaries WHERE dictionary_id = ?",
+                (dictionary_id,)
+            ).fetchone()
+
+    def _decode(self, data: Any, codec: Optional[str]) -> Any:
+        return json.loads(self.codec.decode(data, codec))
+
+    def save_workflows(self, batch: WorkflowBatch):
+        """Insert or update many workflows in a single transaction.
+
+        Only steps beyond those already stored are written, so a workflow may
+        be passed as a full snapshot or as a delta starting at the stored version.
+        """
+        now = format_timestamp(datetime.now())
+        # Spans include the wait for the writer lock
+        with tracer.span("storage.save_workflows", records=len(batch)), self._write_connection() as conn:
+            for workflow, agent_id in batch:
+                stored = conn.execute(SELECT_STEP_COUNT, (workflow.workflow_id,)).fetchone()[0]
+                if workflow.base_version > stored:
+                    raise WorkflowError(
+                        f"Missing steps {stored}-{workflow.base_version} of workflow {workflow.workflow_id}"
                     )
+                if not workflow.is_delta and workflow.version < stored:
+                    # A shorter full snapshot replaces the stored history
+                    conn.execute(TRUNCATE_STEPS, (workflow.workflow_id, 0))
+                    stored = 0
+                conn.executemany(
+                    INSERT_STEP,
+                    [
+                        (workflow.workflow_id, seq, *self._encode(step))
+                        for seq, step in enumerate(
+                            workflow.steps[stored - workflow.base_version:], start=stored
+                        )
+                    ]
                 )
-            else:
-                # Insert new workflow
+                header = {
+                    'workflow_id': workflow.workflow_id,
+                    'metadata': workflow.metadata,
+                    'version': max(workflow.version, stored)
+                }
                 conn.execute(
-                    """
-                    INSERT INTO workflows (workflow_id, agent_id, created_at, data)
-                    VALUES (?, ?, ?, ?)
-                    """,
-                    (
-                        workflow.workflow_id,
-                        agent_id,
-                        datetime.now(),
-                        json.dumps(workflow.__dict__)
-                    )
+                    UPSERT_WORKFLOW,
+                    (workflow.workflow_id, agent_id, now, *self._encode(header))
                 )
 
-    def get_workflow(self, workflow_id: str) -> Dict[str, Any]:
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute(
-                "SELECT data FROM workflows WHERE workflow_id = ?",
-                (workflow_id,)
-            )
+    def get_workflow(self, workflow_id: str, offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Reassemble a workflow, optionally returning only a page of its steps"""
+        with tracer.span("storage.get_workflow", workflow_id=workflow_id), self._read_connection() as conn:
+            cursor = conn.execute(SELECT_WORKFLOW_DATA, (workflow_id,))
             result = cursor.fetchone()
-            return json.loads(result[0]) if result else None 
\ No newline at end of file
+            if not result:
+                return None
+            workflow = self._decode(*result)
+            rows = conn.execute(
+                SELECT_STEPS,
+                (workflow_id, offset, -1 if limit is None else limit)
+            ).fetchall()
+            workflow['steps'] = [self._decode(*row) for row in rows]
+            workflow['base_version'] = offset
+            return workflow
+
+    def save_tasks(self, batch: TaskBatch):
+        """Insert or update many task results in a single transaction"""
+        now = format_timestamp(datetime.now())
+        with tracer.span("storage.save_tasks", records=len(batch)), self._write_connection() as conn:
+            conn.executemany(
+                UPSERT_TASK,
+                [
+                    (
+                        task.task_id,
+                        workflow_id,
+                        status,
+                        now,
+                        now if status in ('completed', 'failed') else None,
+                        *self._encode({'task': task.__dict__, 'result': result})
+                    )
+                    for task, workflow_id, status, result in batch
+                ]
+            )
+
+    def list_workflows(
+        self,
+        agent_id: Optional[str] = None,
+        since: Optional[Union[datetime, str]] = None,
+        until: Optional[Union[datetime, str]] = None,
+        limit: int = 100,
+        after: Optional[Tuple[str, str]] = None
+    ) -> Page:
+        """List workflow headers by agent and/or time range, oldest first.
+
+        Returns a page of rows and the cursor to pass as after for the next
+        page, or None once the listing is exhausted.
+        """
+        clauses, params = [], []
+        if agent_id is not None:
+            clauses.append("agent_id = ?")
+            params.append(agent_id)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(format_timestamp(since))
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(format_timestamp(until))
+        if after is not None:
+            clauses.append("(created_at, workflow_id) > (?, ?)")
+            params.extend(after)
+        query = "SELECT workflow_id, agent_id, created_at, data, codec FROM workflows"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY created_at, workflow_id LIMIT ?"
+        params.append(limit)
+
+        with self._read_connection() as conn:
+            rows = conn.execute(query, params).fetchall()
+        page = [
+            dict(self._decode(data, codec), agent_id=agent, created_at=created_at)
+            for _, agent, created_at, data, codec in rows
+        ]
+        cursor = (rows[-1][2], rows[-1][0]) if len(rows) == limit else None
+        return page, cursor
+
+    def list_tasks(
+        self,
+        status: Optional[str] = None,
+        workflow_id: Optional[str] = None,
+        limit: int = 100,
+        after: Optional[Tuple[str, str]] = None
+    ) -> Page:
+        """List tasks by status and/or workflow, oldest first, with keyset pagination"""
+        clauses, params = [], []
+        if workflow_id is not None:
+            clauses.append("workflow_id = ?")
+            params.append(workflow_id)
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if after is not None:
+            clauses.append("(created_at, task_id) > (?, ?)")
+            params.extend(after)
+        query = "SELECT task_id, workflow_id, status, created_at, completed_at, data, codec FROM tasks"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY created_at, task_id LIMIT ?"
+        params.append(limit)
+
+        with self._read_connection() as conn:
+            rows = conn.execute(query, params).fetchall()
+        page = [
+            {
+                'task_id': task_id,
+                'workflow_id': task_workflow_id,
+                'status': task_status,
+                'created_at': created_at,
+                'completed_at': completed_at,
+                **self._decode(data, codec)
+            }
+            for task_id, task_workflow_id, task_status, created_at, completed_at, data, codec in rows
+        ]
+        cursor = (rows[-1][3], rows[-1][0]) if len(rows) == limit else None
+        return page, cursor
+
+    def find_expired_workflows(
+        self,
+        older_than: Optional[Union[datetime, str]] = None,
+        max_per_agent: Optional[int] = None,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """Return workflows older than a cutoff or beyond the newest max_per_agent of their agent"""
+        queries, params = [], []
+        if older_than is not None:
+            queries.append("SELECT workflow_id, agent_id, created_at FROM workflows WHERE created_at < ?")
+            params.append(format_timestamp(older_than))
+        if max_per_agent is not None:
+            queries.append("""
+                SELECT workflow_id, agent_id, created_at FROM (
+                    SELECT workflow_id, agent_id, created_at, ROW_NUMBER() OVER (
+                        PARTITION BY agent_id ORDER BY created_at DESC, workflow_id DESC
+                    ) AS position
+                    FROM workflows
+                ) WHERE position > ?
+            """)
+            params.append(max_per_agent)
+        if not queries:
+            return []
+        query = " UNION ".join(queries) + " ORDER BY created_at, workflow_id LIMIT ?"
+        params.append(limit)
+        with self._read_connection() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [
+            {'workflow_id': workflow_id, 'agent_id': agent_id, 'created_at': created_at}
+            for workflow_id, agent_id, created_at in rows
+        ]
+
+    def newest_workflows_per_agent(self, count: int) -> List[Dict[str, Any]]:
+        """Return the newest count workflows of every agent"""
+        with self._read_connection() as conn:
+            rows = conn.execute("""
+                SELECT workflow_id, agent_id, created_at FROM (
+                    SELECT workflow_id, agent_id, created_at, ROW_NUMBER() OVER (
+                        PARTITION BY agent_id ORDER BY created_at DESC, workflow_id DESC
+                    ) AS position
+                    FROM workflows
+                ) WHERE position <= ?
+            """, (count,)).fetchall()
+        return [
+            {'workflow_id': workflow_id, 'agent_id': agent_id, 'created_at': created_at}
+            for workflow_id, agent_id, created_at in rows
+        ]
+
+    def delete_workflows(self, workflow_ids: List[str]):
+        """Delete workflows with their steps and tasks in a single transaction"""
+        with self._write_connection() as conn:
+            for table in ('workflow_steps', 'tasks', 'workflows'):
+                conn.executemany(f"DELETE FROM {table} WHERE workflow_id = ?", [(w,) for w in workflow_ids])
+
+    def incremental_vacuum(self, pages: int = 256) -> int:
+        """Return up to pages free pages to the filesystem, returning how many remain free"""
+        with self._write_lock:
+            # execute() would step the pragma once, freeing a single page; executescript runs it to completion
+            self._writer.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+            return self._writer.execute("PRAGMA freelist_count").fetchone()[0]
+
+    def incremental_vacuum_enabled(self) -> bool:
+        with self._write_lock:
+            return self._writer.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+
+    def enable_incremental_vacuum(self):
+        """Switch a database created without auto_vacuum over; rewrites the whole file once"""
+        with self._write_lock:
+            if self._writer.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                self._writer.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                self._writer.execute("VACUUM")
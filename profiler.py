@@ -0,0 +1,156 @@
+from typing import Dict, Optional, Tuple
+import asyncio
+import logging
+import os
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Attribution labels such as "workflow=w1;agent=a1;task=t3", inherited by child tasks
+_profile_tags: ContextVar[Optional[str]] = ContextVar('profile_tags', default=None)
+
+class SamplingProfiler:
+    """Opt-in statistical profiler for the event loop thread.
+
+    A background thread wakes every interval seconds, captures the loop
+    thread's stack with sys._current_frames() and counts it under the tags
+    of the asyncio task running at that moment. Nothing is traced between
+    samples, so the cost is bounded by the sampling rate and is zero while
+    stopped. start() and stop() can be called at any time; tag() is always
+    cheap. Output is in the collapsed-stack format read by flamegraph.pl
+    and speedscope.
+    """
+    def __init__(self, interval: float = 0.005, max_depth: int = 128):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self._target_thread: Optional[int] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        # Innermost tags per task, for interpreters whose tasks don't expose their context
+        self._task_tags: Dict[asyncio.Task, str] = {}
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    @contextmanager
+    def tag(self, **labels):
+        """Attribute samples taken inside the block, and in tasks it spawns, to labels"""
+        parent = _profile_tags.get()
+        # ';' separates frames and ' ' precedes the count in collapsed output
+        own = ";".join(
+            f"{key}={str(value).replace(';', '_').replace(' ', '_')}" for key, value in labels.items()
+        )
+        label = f"{parent};{own}" if parent else own
+        token = _profile_tags.set(label)
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        previous = self._task_tags.get(task) if task is not None else None
+        if task is not None:
+            self._task_tags[task] = label
+        try:
+            yield
+        finally:
+            _profile_tags.reset(token)
+            if task is not None:
+                if previous is None:
+                    self._task_tags.pop(task, None)
+                else:
+                    self._task_tags[task] = previous
+
+    def start(self, interval: Optional[float] = None, thread_id: Optional[int] = None):
+        """Begin sampling the calling thread (normally the event loop's), or thread_id"""
+        if self.running:
+            return
+        if interval is not None:
+            self.interval = interval
+        self._target_thread = thread_id if thread_id is not None else threading.get_ident()
+        try:
+            self._loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._loop = None
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        self.logger.info(f"Sampling profiler started at {1 / self.interval:.0f} Hz")
+
+    def stop(self):
+        if not self.running:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def reset(self):
+        with self._lock:
+            self.samples.clear()
+            self.sample_count = 0
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target_thread)
+            if frame is None:
+                continue
+            stack = self._stack(frame)
+            label = self._current_tags() or "untagged"
+            with self._lock:
+                self.samples[(label,) + stack] += 1
+                self.sample_count += 1
+            # Drop the reference so the sampled thread's frames can be freed
+            del frame
+
+    def _stack(self, frame) -> Tuple[str, ...]:
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+    def _current_tags(self) -> Optional[str]:
+        if self._loop is None:
+            return None
+        task = asyncio.current_task(self._loop)
+        if task is None:
+            return None
+        # Task.get_context() arrived in 3.12 and also covers untagged child tasks
+        get_context = getattr(task, 'get_context', None)
+        if get_context is not None:
+            return get_context().get(_profile_tags)
+        return self._task_tags.get(task)
+
+    def collapsed(self) -> str:
+        """Render samples as 'frame;frame;frame count' lines, root first, with each tag as a leading frame"""
+        with self._lock:
+            samples = list(self.samples.items())
+        return "".join(
+            f"{';'.join(stack)} {count}\n"
+            for stack, count in sorted(samples, key=lambda item: -item[1])
+        )
+
+    def write(self, path: str) -> int:
+        """Write the collapsed stacks to path, returning the number of samples"""
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.collapsed())
+        return self.sample_count
+
+    def get_stats(self) -> Dict[str, float]:
+        return {
+            'running': self.running,
+            'interval': self.interval,
+            'samples': self.sample_count,
+            'distinct_stacks': len(self.samples)
+        }
+
+# Process-wide profiler used by the orchestrators' hooks; idle until started
+profiler = SamplingProfiler()
@@ -0,0 +1,115 @@
+from typing import Dict, Any, List, Optional
+import bisect
+import math
+from itertools import accumulate
+
+class LatencyHistogram:
+    """Mergeable latency histogram with logarithmic buckets, in the spirit of HDR histograms.
+
+    Bucket boundaries grow by a factor of (1 + 2 * relative_error), so any
+    recorded value between min_value and max_value is reported within
+    relative_error of its true value. Memory is a fixed array of counters,
+    whatever the number of samples. Histograms built with the same settings
+    can be merged exactly, and to_dict/from_dict carry them between processes.
+    """
+    def __init__(self, min_value: float = 1e-6, max_value: float = 3600.0, relative_error: float = 0.01):
+        self.min_value = min_value
+        self.max_value = max_value
+        self.relative_error = relative_error
+        self._growth = 1 + 2 * relative_error
+        self._log_growth = math.log(self._growth)
+        # Bucket 0 holds everything at or below min_value, the last bucket everything above max_value
+        self.bucket_count = int(math.ceil(math.log(max_value / min_value) / self._log_growth)) + 2
+        self.counts: List[int] = [0] * self.bucket_count
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self._cumulative: Optional[List[int]] = None
+
+    def bucket_index(self, value: float) -> int:
+        if value <= self.min_value:
+            return 0
+        index = 1 + int(math.log(value / self.min_value) / self._log_growth)
+        return min(index, self.bucket_count - 1)
+
+    def bucket_value(self, index: int) -> float:
+        if index == 0:
+            return self.min_value
+        # Geometric midpoint of the bucket, which bounds the relative error
+        return self.min_value * self._growth ** (index - 0.5)
+
+    def record(self, value: float):
+        self.counts[self.bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self._cumulative = None
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        if self._cumulative is None:
+            # Rebuilt at most once between records, so repeated queries cost a binary search
+            self._cumulative = list(accumulate(self.counts))
+        rank = max(1, int(math.ceil(q * self.count)))
+        value = self.bucket_value(bisect.bisect_left(self._cumulative, rank))
+        return min(max(value, self.min), self.max)
+
+    def count_at_or_below(self, value: float) -> int:
+        """Number of samples up to value, at bucket resolution"""
+        if not self.count:
+            return 0
+        if self._cumulative is None:
+            self._cumulative = list(accumulate(self.counts))
+        return self._cumulative[self.bucket_index(value)]
+
+    def percentiles(self) -> Dict[str, float]:
+        return {
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99),
+            'max': self.max or 0.0
+        }
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def merge(self, other: 'LatencyHistogram'):
+        if (other.min_value, other.max_value, other.relative_error) != (self.min_value, self.max_value, self.relative_error):
+            raise ValueError("Only histograms with the same bucket layout can be merged")
+        for index, bucket_count in enumerate(other.counts):
+            if bucket_count:
+                self.counts[index] += bucket_count
+        self.count += other.count
+        self.total += other.total
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        self._cumulative = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'min_value': self.min_value,
+            'max_value': self.max_value,
+            'relative_error': self.relative_error,
+            'count': self.count,
+            'total': self.total,
+            'min': self.min,
+            'max': self.max,
+            # Only non-empty buckets are sent; most of the range is usually unused
+            'buckets': {str(index): bucket_count for index, bucket_count in enumerate(self.counts) if bucket_count}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'LatencyHistogram':
+        histogram = cls(data['min_value'], data['max_value'], data['relative_error'])
+        for index, bucket_count in data['buckets'].items():
+            histogram.counts[int(index)] = bucket_count
+        histogram.count = data['count']
+        histogram.total = data['total']
+        histogram.min = data['min']
+        histogram.max = data['max']
+        return histogram
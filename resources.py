@@ -0,0 +1,96 @@
+from typing import Dict, Optional, Tuple
+import os
+import random
+import time
+import tracemalloc
+from dataclasses import dataclass
+
+try:
+    _PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = 4096
+
+def rss_bytes() -> int:
+    """Resident set size of this process, or 0 where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+@dataclass
+class ResourceSample:
+    cpu_seconds: float
+    wall_seconds: float
+    allocated_bytes: Optional[int]
+    rss_bytes: int
+
+@dataclass
+class ResourceStats:
+    """Running totals of the resource samples taken for one agent or task type"""
+    samples: int = 0
+    cpu_seconds: float = 0.0
+    wall_seconds: float = 0.0
+    allocated_bytes: int = 0
+    allocation_samples: int = 0
+    rss_bytes: int = 0
+    max_rss_bytes: int = 0
+
+    def record(self, sample: ResourceSample):
+        self.samples += 1
+        self.cpu_seconds += sample.cpu_seconds
+        self.wall_seconds += sample.wall_seconds
+        if sample.allocated_bytes is not None:
+            self.allocated_bytes += sample.allocated_bytes
+            self.allocation_samples += 1
+        self.rss_bytes = sample.rss_bytes
+        self.max_rss_bytes = max(self.max_rss_bytes, sample.rss_bytes)
+
+    def usage(self) -> Dict[str, float]:
+        return {
+            # Share of wall time spent on the CPU, comparable to a utilisation figure
+            'cpu': self.cpu_seconds / self.wall_seconds if self.wall_seconds else 0.0,
+            'cpu_seconds': self.cpu_seconds / self.samples if self.samples else 0.0,
+            'memory': self.rss_bytes / (1024 * 1024),
+            'max_memory': self.max_rss_bytes / (1024 * 1024),
+            'allocated_kb': self.allocated_bytes / self.allocation_samples / 1024 if self.allocation_samples else 0.0
+        }
+
+class ResourceSampler:
+    """Measures CPU time, allocations and RSS for a random sample of tasks.
+
+    CPU is the calling thread's CPU time between start and stop. Tasks that
+    interleave on the event loop thread share that time, so the figure is
+    an upper bound per task; it is exact for tasks run to completion on
+    their own thread. Allocation deltas are net bytes traced by tracemalloc
+    and only collected when trace_allocations is set, since tracing slows
+    every allocation. sample_rate trades coverage for overhead.
+    """
+    def __init__(self, sample_rate: float = 0.1, trace_allocations: bool = False):
+        self.sample_rate = sample_rate
+        self.trace_allocations = trace_allocations
+        if trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self._started: Dict[str, Tuple[float, float, Optional[int]]] = {}
+
+    def start(self, task_id: str):
+        if random.random() >= self.sample_rate:
+            return
+        allocated = tracemalloc.get_traced_memory()[0] if self.trace_allocations else None
+        self._started[task_id] = (time.thread_time(), time.perf_counter(), allocated)
+
+    def stop(self, task_id: str) -> Optional[ResourceSample]:
+        """Return the task's sample, or None if it was not sampled"""
+        started = self._started.pop(task_id, None)
+        if started is None:
+            return None
+        cpu_start, wall_start, allocated_start = started
+        allocated = None
+        if allocated_start is not None and tracemalloc.is_tracing():
+            allocated = tracemalloc.get_traced_memory()[0] - allocated_start
+        return ResourceSample(
+            cpu_seconds=time.thread_time() - cpu_start,
+            wall_seconds=time.perf_counter() - wall_start,
+            allocated_bytes=allocated,
+            rss_bytes=rss_bytes()
+        )
@@ -0,0 +1,136 @@
+from typing import Dict, Any, List, Optional
+import gzip
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from .persistence import StorageBackend
+
+@dataclass
+class RetentionPolicy:
+    max_age: Optional[timedelta] = None
+    max_per_agent: Optional[int] = None
+
+class WorkflowArchiver:
+    """Moves workflows outside a RetentionPolicy into date-partitioned archive files.
+
+    Work is done in small slices: each slice archives and deletes at most
+    batch_size workflows, then returns up to vacuum_pages free pages to the
+    filesystem, so the writer is never held for long. Archive files are
+    gzip-compressed JSON lines at archive_dir/YYYY/MM/DD.jsonl.gz, keyed by
+    the workflow's created_at date. Rows are written to the archive before
+    they are deleted, so a crash can archive a workflow twice but never lose it.
+
+    Vacuuming needs auto_vacuum=INCREMENTAL, which SQLite only applies to new
+    databases. With enable_vacuum the first slice converts an older database
+    with a one-off VACUUM that rewrites the whole file; otherwise it only
+    warns and skips vacuuming.
+    """
+    def __init__(
+        self,
+        storage: StorageBackend,
+        policy: RetentionPolicy,
+        archive_dir: str = "archive",
+        batch_size: int = 100,
+        vacuum_pages: int = 256,
+        interval: float = 60.0,
+        slice_pause: float = 0.05,
+        enable_vacuum: bool = False
+    ):
+        self.storage = storage
+        self.policy = policy
+        self.archive_dir = archive_dir
+        self.batch_size = batch_size
+        self.vacuum_pages = vacuum_pages
+        self.interval = interval
+        self.slice_pause = slice_pause
+        self.enable_vacuum = enable_vacuum
+        self.archived = 0
+        self._vacuum_enabled: Optional[bool] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.logger = logging.getLogger(__name__)
+
+    def run_once(self) -> int:
+        """Archive one slice of expired workflows, returning how many were moved"""
+        older_than = datetime.now() - self.policy.max_age if self.policy.max_age is not None else None
+        expired = self.storage.find_expired_workflows(
+            older_than=older_than,
+            max_per_agent=self.policy.max_per_agent,
+            limit=self.batch_size
+        )
+        if expired:
+            self._archive(expired)
+            self.storage.delete_workflows([row['workflow_id'] for row in expired])
+            self.archived += len(expired)
+        if self._vacuum_enabled is None:
+            self._vacuum_enabled = self._check_vacuum()
+        if self._vacuum_enabled:
+            self.storage.incremental_vacuum(self.vacuum_pages)
+        return len(expired)
+
+    def _check_vacuum(self) -> bool:
+        if self.storage.incremental_vacuum_enabled():
+            return True
+        if self.enable_vacuum:
+            self.logger.info("Enabling incremental vacuum; rewriting the database once")
+            self.storage.enable_incremental_vacuum()
+            return True
+        self.logger.warning(
+            "auto_vacuum is off for this database, so archived space is never returned to the filesystem; "
+            "pass enable_vacuum=True or call enable_incremental_vacuum()"
+        )
+        return False
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="workflow-archiver", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                # Keep slicing until nothing is left, pausing so other writers get the lock
+                while self.run_once() and not self._stop.wait(self.slice_pause):
+                    pass
+            except Exception as e:
+                self.logger.error(f"Workflow archiving failed: {str(e)}")
+            self._stop.wait(self.interval)
+
+    def _archive(self, expired: List[Dict[str, Any]]):
+        partitions: Dict[str, List[str]] = {}
+        for row in expired:
+            record = {
+                'workflow': self.storage.get_workflow(row['workflow_id']),
+                'agent_id': row['agent_id'],
+                'created_at': row['created_at'],
+                'tasks': self._tasks(row['workflow_id'])
+            }
+            partitions.setdefault(row['created_at'][:10], []).append(json.dumps(record, default=str))
+
+        for day, lines in partitions.items():
+            year, month, date = day.split('-')
+            directory = os.path.join(self.archive_dir, year, month)
+            os.makedirs(directory, exist_ok=True)
+            # Appending adds a gzip member; gzip readers treat the file as one stream
+            with open(os.path.join(directory, f"{date}.jsonl.gz"), 'ab') as f:
+                f.write(gzip.compress(("\n".join(lines) + "\n").encode('utf-8')))
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _tasks(self, workflow_id: str) -> List[Dict[str, Any]]:
+        tasks, cursor = self.storage.list_tasks(workflow_id=workflow_id, limit=self.batch_size)
+        while cursor is not None:
+            page, cursor = self.storage.list_tasks(workflow_id=workflow_id, limit=self.batch_size, after=cursor)
+            tasks.extend(page)
+        return tasks
@@ -0,0 +1,141 @@
+from typing import Dict, Any, Iterator, List, Optional
+import time
+import numpy as np
+from datetime import datetime
+
+# Error code shared by every distinct error seen after the table is full
+OTHER_ERROR = "<other>"
+
+class MetricsRingBuffer:
+    """Fixed-capacity columnar store of per-task metrics; the oldest rows are overwritten.
+
+    Each row costs 29 bytes across typed columns: int64 nanosecond
+    timestamps, float64 durations, and int32/int8 codes for the agent, task
+    type and error, interned into small lookup tables. Error messages often
+    embed task-specific text, so exceptions are interned by class and at
+    most max_errors distinct messages are kept, later ones sharing
+    OTHER_ERROR. Summaries are vectorised over the columns, and any time
+    window can be exported.
+    """
+    def __init__(self, capacity: int = 1_000_000, max_errors: int = 1024):
+        self.capacity = capacity
+        self.max_errors = max_errors
+        # np.zeros is lazily backed, so unused capacity costs no resident memory
+        self.timestamps = np.zeros(capacity, dtype=np.int64)
+        self.durations = np.zeros(capacity, dtype=np.float64)
+        self.agents = np.zeros(capacity, dtype=np.int32)
+        self.task_types = np.zeros(capacity, dtype=np.int32)
+        self.errors = np.zeros(capacity, dtype=np.int32)
+        self.successes = np.zeros(capacity, dtype=np.int8)
+        # Code 0 stands for None in task_types and errors
+        self._names: Dict[str, List[Optional[str]]] = {'agents': [], 'task_types': [None], 'errors': [None]}
+        self._codes: Dict[str, Dict[Optional[str], int]] = {'agents': {}, 'task_types': {None: 0}, 'errors': {None: 0}}
+        self._next = 0
+        self.size = 0
+
+    def _intern(self, table: str, value: Optional[str], limit: Optional[int] = None) -> int:
+        codes = self._codes[table]
+        code = codes.get(value)
+        if code is None:
+            if limit is not None and len(self._names[table]) >= limit:
+                return self._intern(table, OTHER_ERROR)
+            code = codes[value] = len(self._names[table])
+            self._names[table].append(value)
+        return code
+
+    def append(
+        self,
+        agent_id: str,
+        duration: float,
+        success: bool,
+        error: Optional[str] = None,
+        task_type: Optional[str] = None,
+        timestamp_ns: Optional[int] = None
+    ):
+        index = self._next
+        self.timestamps[index] = timestamp_ns if timestamp_ns is not None else time.time_ns()
+        self.durations[index] = duration
+        self.agents[index] = self._intern('agents', agent_id)
+        self.task_types[index] = self._intern('task_types', task_type)
+        self.errors[index] = self._intern('errors', _error_name(error), self.max_errors)
+        self.successes[index] = success
+        self._next = (index + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _order(self) -> np.ndarray:
+        """Indices of the stored rows, oldest first"""
+        if self.size < self.capacity:
+            return np.arange(self.size)
+        return np.roll(np.arange(self.capacity), -self._next)
+
+    def _select(
+        self,
+        agent_id: Optional[str] = None,
+        task_type: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> np.ndarray:
+        rows = self._order()
+        mask = np.ones(len(rows), dtype=bool)
+        if agent_id is not None:
+            mask &= self.agents[rows] == self._codes['agents'].get(agent_id, -1)
+        if task_type is not None:
+            mask &= self.task_types[rows] == self._codes['task_types'].get(task_type, -1)
+        if since is not None:
+            mask &= self.timestamps[rows] >= int(since.timestamp() * 1e9)
+        if until is not None:
+            mask &= self.timestamps[rows] < int(until.timestamp() * 1e9)
+        return rows[mask]
+
+    def summary(self, **filters) -> Dict[str, float]:
+        """Count, rates and duration percentiles of the rows matching agent_id/task_type/since/until"""
+        rows = self._select(**filters)
+        if not len(rows):
+            return {'count': 0, 'success_rate': 0.0, 'error_rate': 0.0, 'mean': 0.0,
+                    'p50': 0.0, 'p90': 0.0, 'p99': 0.0, 'max': 0.0}
+        durations = self.durations[rows]
+        p50, p90, p99 = np.percentile(durations, [50, 90, 99])
+        return {
+            'count': int(len(rows)),
+            'success_rate': float(self.successes[rows].mean()),
+            'error_rate': float((self.errors[rows] != 0).mean()),
+            'mean': float(durations.mean()),
+            'p50': float(p50),
+            'p90': float(p90),
+            'p99': float(p99),
+            'max': float(durations.max())
+        }
+
+    def window(self, **filters) -> Dict[str, np.ndarray]:
+        """Copy the matching rows out as decoded columns, oldest first"""
+        rows = self._select(**filters)
+        return {
+            'timestamp_ns': self.timestamps[rows],
+            'duration': self.durations[rows],
+            'agent_id': np.array(self._names['agents'], dtype=object)[self.agents[rows]],
+            'task_type': np.array(self._names['task_types'], dtype=object)[self.task_types[rows]],
+            'error': np.array(self._names['errors'], dtype=object)[self.errors[rows]],
+            'success': self.successes[rows].astype(bool)
+        }
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Yield rows as dicts shaped like the old list-based metrics_store entries"""
+        for index in self._order():
+            yield {
+                'agent_id': self._names['agents'][self.agents[index]],
+                'task_type': self._names['task_types'][self.task_types[index]],
+                'duration': float(self.durations[index]),
+                'timestamp': datetime.fromtimestamp(self.timestamps[index] / 1e9),
+                'success': bool(self.successes[index]),
+                'error': self._names['errors'][self.errors[index]]
+            }
+
+def _error_name(error: Any) -> Optional[str]:
+    if error is None:
+        return None
+    if isinstance(error, BaseException):
+        return type(error).__name__
+    return str(error)
@@ -17,12 +17,13 @@ class SimpleAgent(AgentInterface):
         self.current_workflow.append(result)
         return result
         
-    def share_workflow(self) -> WorkflowData:
+    def share_workflow(self, since_version: int = 0) -> WorkflowData:
         """Share current workflow"""
         return WorkflowData(
             workflow_id=f"{self.agent_name}_workflow",
-            steps=self.current_workflow,
-            metadata={'agent_name': self.agent_name}
+            steps=self.current_workflow[since_version:],
+            metadata={'agent_name': self.agent_name},
+            base_version=since_version
         )
         
     def receive_workflow(self, workflow_data: WorkflowData) -> None:
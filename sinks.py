@@ -0,0 +1,161 @@
+from typing import Dict, Any, Callable, List, Optional
+import gzip
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+
+class JsonLinesSink:
+    """Appends records to a JSON lines file, rotating it by size and age.
+
+    Records are buffered and written by a background thread once
+    buffer_size are pending or flush_interval seconds have passed, so at
+    most flush_interval seconds of records are at risk in a crash and
+    write() never does file I/O on the caller's thread. When the file
+    reaches max_bytes or max_age seconds it is renamed with a timestamp
+    suffix and, if compress is set, gzipped by the same thread outside the
+    lock. At most max_buffered records are held; if the file stalls for
+    longer than that, further records are dropped and counted in dropped
+    rather than growing memory.
+    """
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_age: Optional[float] = 3600.0,
+        compress: bool = True,
+        buffer_size: int = 1000,
+        flush_interval: Optional[float] = 5.0,
+        on_flush: Optional[Callable[[int], None]] = None,
+        max_buffered: int = 100000
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.compress = compress
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        # Called with the number of records written after each flush
+        self.on_flush = on_flush
+        self.records_written = 0
+        self.rotations = 0
+        self.dropped = 0
+        self._reported_drops = 0
+        self._buffer: List[str] = []
+        # Rotated files waiting to be compressed
+        self._rotated: List[str] = []
+        # _lock guards only the buffer, so write() never waits on file I/O held under _io_lock
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._file = None
+        self._opened_at = 0.0
+        self._last_flush = time.monotonic()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self.logger = logging.getLogger(__name__)
+        self._open()
+        # Always started: it also serves full buffers, so flush_interval=None only disables idle flushes
+        self._thread = threading.Thread(target=self._run, name="metrics-sink-flush", daemon=True)
+        self._thread.start()
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._opened_at = time.monotonic()
+
+    def write(self, record: Dict[str, Any]):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            if len(self._buffer) >= self.max_buffered:
+                self.dropped += 1
+                return
+            self._buffer.append(line)
+            due = len(self._buffer) >= self.buffer_size
+        if due:
+            self._wake.set()
+
+    def flush(self):
+        """Write buffered records now; rotated files are compressed later by the flush thread"""
+        with self._io_lock:
+            # Swapped under _io_lock too, so concurrent flushes write batches in order
+            with self._lock:
+                lines, self._buffer = self._buffer, []
+                dropped = self.dropped - self._reported_drops
+                self._reported_drops = self.dropped
+            if dropped:
+                self.logger.warning(f"Metrics sink dropped {dropped} records while its buffer was full")
+            if lines:
+                self._file.write("\n".join(lines) + "\n")
+                self._file.flush()
+                self.records_written += len(lines)
+            self._last_flush = time.monotonic()
+            if self._should_rotate():
+                self._rotate()
+        if lines and self.on_flush is not None:
+            self.on_flush(len(lines))
+
+    def _should_rotate(self) -> bool:
+        if self._file.tell() == 0:
+            return False
+        if self._file.tell() >= self.max_bytes:
+            return True
+        return self.max_age is not None and time.monotonic() - self._opened_at >= self.max_age
+
+    def _rotate(self):
+        self._file.close()
+        rotated = f"{self.path}.{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+        suffix = 0
+        while os.path.exists(rotated + (f".{suffix}" if suffix else "")) or \
+                os.path.exists(rotated + (f".{suffix}" if suffix else "") + ".gz"):
+            suffix += 1
+        rotated += f".{suffix}" if suffix else ""
+        os.replace(self.path, rotated)
+        if self.compress:
+            self._rotated.append(rotated)
+        self.rotations += 1
+        self._open()
+
+    def _compress_rotated(self):
+        with self._io_lock:
+            rotated, self._rotated = self._rotated, []
+        failed = []
+        for path in rotated:
+            try:
+                with open(path, 'rb') as source, gzip.open(path + ".gz", 'wb') as target:
+                    shutil.copyfileobj(source, target)
+                os.remove(path)
+            except FileNotFoundError:
+                # Moved or removed by someone else; nothing left to compress
+                pass
+            except OSError as e:
+                self.logger.error(f"Could not compress rotated metrics file {path}: {str(e)}")
+                failed.append(path)
+        if failed:
+            # The uncompressed files are still complete; try them again on the next pass
+            with self._io_lock:
+                self._rotated[:0] = failed
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+                self._compress_rotated()
+            except Exception as e:
+                self.logger.error(f"Metrics sink flush failed: {str(e)}")
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+        self._compress_rotated()
+        with self._io_lock:
+            self._file.close()
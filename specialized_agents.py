@@ -8,7 +8,7 @@ class AIAgent(AgentInterface):
         self.model_name = model_name
         self.api_key = api_key
         self.workflow_history = []
-        self.learning_data = []
+        self.learning_data: Dict[str, WorkflowData] = {}
 
     async def execute_task(self, task_data: TaskData) -> Dict[str, Any]:
         # Simulate AI processing with some delay
@@ -27,24 +27,27 @@ class AIAgent(AgentInterface):
         # Implement actual AI processing logic here
         return {'ai_processed': True, 'parameters': parameters}
 
-    def share_workflow(self) -> WorkflowData:
-        # Implement the required share_workflow method
+    def share_workflow(self, since_version: int = 0) -> WorkflowData:
+        # Only the steps appended since the caller's last-seen version
         return WorkflowData(
             workflow_id=f"{self.model_name}_workflow",
-            steps=self.workflow_history,
+            steps=self.workflow_history[since_version:],
             metadata={
                 'model_name': self.model_name,
                 'total_tasks': len(self.workflow_history)
-            }
+            },
+            version=len(self.workflow_history),
+            base_version=since_version
         )
 
     def receive_workflow(self, workflow_data: WorkflowData) -> None:
-        # Implement the required receive_workflow method
-        self.learning_data.append({
-            'workflow_id': workflow_data.workflow_id,
-            'steps': workflow_data.steps,
-            'metadata': workflow_data.metadata
-        })
+        # Merge deltas into the copy we already hold
+        known = self.learning_data.get(workflow_data.workflow_id)
+        if known is None:
+            known = self.learning_data[workflow_data.workflow_id] = WorkflowData(
+                workflow_data.workflow_id, [], {}
+            )
+        known.apply_delta(workflow_data)
 
 class DataProcessingAgent(AgentInterface):
     """Agent specialized in data processing tasks"""
@@ -52,7 +55,7 @@ class DataProcessingAgent(AgentInterface):
         self.processing_type = processing_type
         self.processed_items = 0
         self.workflow_cache = []
-        self.received_workflows = []
+        self.received_workflows: Dict[str, WorkflowData] = {}
 
     async def execute_task(self, task_data: TaskData) -> Dict[str, Any]:
         # Simulate data processing with some delay
@@ -67,21 +70,24 @@ class DataProcessingAgent(AgentInterface):
         self.workflow_cache.append(result)
         return result
 
-    def share_workflow(self) -> WorkflowData:
-        # Implement the required share_workflow method
+    def share_workflow(self, since_version: int = 0) -> WorkflowData:
+        # Only the steps appended since the caller's last-seen version
         return WorkflowData(
             workflow_id=f"{self.processing_type}_workflow",
-            steps=self.workflow_cache,
+            steps=self.workflow_cache[since_version:],
             metadata={
                 'processing_type': self.processing_type,
                 'total_processed': self.processed_items
-            }
+            },
+            version=len(self.workflow_cache),
+            base_version=since_version
         )
 
     def receive_workflow(self, workflow_data: WorkflowData) -> None:
-        # Implement the required receive_workflow method
-        self.received_workflows.append({
-            'workflow_id': workflow_data.workflow_id,
-            'steps': workflow_data.steps,
-            'metadata': workflow_data.metadata
-        }) 
\ No newline at end of file
+        # Merge deltas into the copy we already hold
+        known = self.received_workflows.get(workflow_data.workflow_id)
+        if known is None:
+            known = self.received_workflows[workflow_data.workflow_id] = WorkflowData(
+                workflow_data.workflow_id, [], {}
+            )
+        known.apply_delta(workflow_data) 
\ No newline at end of file
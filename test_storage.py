@@ -0,0 +1,176 @@
+import sys
+import os
+import tempfile
+from pathlib import Path
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent)
+sys.path.append(project_root)
+
+import sqlite3
+from src.core.interfaces import TaskData, WorkflowData
+from src.storage.compression import PayloadCodec
+from src.storage.persistence import WorkflowStorage
+from src.utils.exceptions import WorkflowError
+from src.storage.write_behind import WriteBehindQueue
+
+class FlakyStorage(WorkflowStorage):
+    """WorkflowStorage whose next `failures` workflow saves raise like a locked database"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.failures = 0
+
+    def save_workflows(self, batch):
+        if self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError("database is locked")
+        super().save_workflows(batch)
+
+def test_write_behind_resends_after_failed_write():
+    with tempfile.TemporaryDirectory() as directory:
+        storage = FlakyStorage(os.path.join(directory, "workflows.db"))
+        writer = WriteBehindQueue(storage)
+        workflow = WorkflowData("w", [], {})
+        shared = 0
+
+        # The batch save and its one-by-one retry both fail
+        storage.failures = 2
+        workflow.apply_delta(WorkflowData("w", [{'step': 0}, {'step': 1}], {}))
+        writer.submit_workflow(workflow.since(shared), "agent")
+        shared = workflow.version
+        writer.flush()
+        assert writer.get_stats()['write_errors'] == 1
+
+        # Later submissions are deltas starting past what was stored
+        for step in range(2, 5):
+            workflow.apply_delta(WorkflowData("w", [{'step': step}], {}, base_version=step))
+            writer.submit_workflow(workflow.since(shared), "agent")
+            shared = workflow.version
+            writer.flush()
+
+        stored = storage.get_workflow("w")
+        assert stored is not None
+        assert [step['step'] for step in stored['steps']] == list(range(5))
+        assert writer.get_stats()['write_errors'] == 1
+        writer.close()
+        storage.close()
+
+def test_write_behind_recreates_deleted_workflow():
+    with tempfile.TemporaryDirectory() as directory:
+        storage = WorkflowStorage(os.path.join(directory, "workflows.db"))
+        writer = WriteBehindQueue(storage)
+        workflow = WorkflowData("w", [], {})
+        workflow.apply_delta(WorkflowData("w", [{'step': 0}, {'step': 1}], {}))
+        writer.submit_workflow(workflow, "agent")
+        writer.flush()
+
+        # Archived while its agent keeps appending steps
+        storage.delete_workflows(["w"])
+        for step in range(2, 5):
+            workflow.apply_delta(WorkflowData("w", [{'step': step}], {}, base_version=step))
+            writer.submit_workflow(workflow, "agent")
+            writer.flush()
+
+        # Only the first delta after the delete hits the gap
+        assert writer.get_stats()['write_errors'] == 1
+        assert [step['step'] for step in storage.get_workflow("w")['steps']] == list(range(5))
+        writer.close()
+        storage.close()
+
+class CrashingStorage(WorkflowStorage):
+    """WorkflowStorage whose next `task_failures` task saves raise, as if the import were killed mid-batch"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.task_failures = 0
+
+    def save_tasks(self, batch):
+        if self.task_failures:
+            self.task_failures -= 1
+            raise RuntimeError("import interrupted")
+        super().save_tasks(batch)
+
+def test_import_resumes_after_interruption():
+    with tempfile.TemporaryDirectory() as directory:
+        source = WorkflowStorage(os.path.join(directory, "source.db"))
+        steps = [{'step': i} for i in range(6)]
+        source.save_workflows([(WorkflowData("w", steps, {'owner': "a"}), "agent")])
+        source.save_tasks([
+            (TaskData(f"t{i}", "analysis", {'n': i}), "w", "completed", {'value': i}) for i in range(3)
+        ])
+        export_path = os.path.join(directory, "export.jsonl.gz")
+        # One workflow record, two step pages, then three task records
+        assert source.export_workflows(export_path, step_page_size=2) == 1
+        source.close()
+
+        target = CrashingStorage(os.path.join(directory, "target.db"))
+        # The second batch (a step page and a task) commits its steps, then dies before its checkpoint
+        target.task_failures = 1
+        try:
+            target.import_workflows(export_path, batch_size=2)
+            assert False, "the interrupted import must raise"
+        except RuntimeError:
+            pass
+        with open(export_path + '.progress') as f:
+            assert f.read() == "2"
+        assert target.get_workflow("w")['version'] == 6
+
+        # Resuming replays that batch; its step page needs the header from before the checkpoint
+        assert target.import_workflows(export_path, batch_size=2) == 4
+        assert not os.path.exists(export_path + '.progress')
+        workflow = target.get_workflow("w")
+        assert workflow['steps'] == steps and workflow['metadata'] == {'owner': "a"}
+        tasks, _ = target.list_tasks(workflow_id="w")
+        assert [task['task_id'] for task in tasks] == ["t0", "t1", "t2"]
+        target.close()
+
+def test_dictionary_survives_rolled_back_transaction():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "workflows.db")
+        storage = WorkflowStorage(path)
+        # zlib always yields a dictionary, however few samples
+        storage.codec = PayloadCodec(codec='zlib', train_after=4)
+        big_steps = [{'step': i, 'text': f"payload {i} " * 200} for i in range(8)]
+
+        # Enough samples to train are collected, then the delta's gap rolls the batch back
+        try:
+            storage.save_workflows([
+                (WorkflowData("big", big_steps, {}), "agent"),
+                (WorkflowData("gapped", [{'step': 5}], {}, base_version=5), "agent")
+            ])
+            assert False, "a delta past the stored steps must be rejected"
+        except WorkflowError:
+            pass
+
+        storage.save_workflows([(WorkflowData("big", big_steps, {}), "agent")])
+        storage.save_workflows([(WorkflowData("later", big_steps, {}), "agent")])
+        storage.close()
+
+        reopened = WorkflowStorage(path)
+        for workflow_id in ("big", "later"):
+            assert reopened.get_workflow(workflow_id)['steps'] == big_steps
+        reopened.close()
+
+def test_reader_loads_dictionary_trained_by_another_instance():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "workflows.db")
+        writer = WorkflowStorage(path)
+        writer.codec = PayloadCodec(codec='zlib', train_after=4, dictionary_loader=writer._load_dictionary)
+        reader = WorkflowStorage(path)
+        big_steps = [{'step': i, 'text': f"payload {i} " * 200} for i in range(8)]
+
+        # The first save trains a dictionary the second one is compressed with
+        writer.save_workflows([(WorkflowData("big", big_steps, {}), "agent")])
+        writer.save_workflows([(WorkflowData("later", big_steps, {}), "agent")])
+        assert writer.codec.active_dictionary is not None
+
+        assert reader.get_workflow("later")['steps'] == big_steps
+        writer.close()
+        reader.close()
+
+if __name__ == "__main__":
+    test_write_behind_resends_after_failed_write()
+    test_write_behind_recreates_deleted_workflow()
+    test_import_resumes_after_interruption()
+    test_dictionary_survives_rolled_back_transaction()
+    test_reader_loads_dictionary_trained_by_another_instance()
+    print("Storage tests passed")
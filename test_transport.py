@@ -0,0 +1,146 @@
+import sys
+import asyncio
+import os
+import tempfile
+from pathlib import Path
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent)
+sys.path.append(project_root)
+
+from src.core.communication import Message
+from src.core.transport import (
+    BatchedWriter, BusRouter, DistributedCommunicationBus, FRAME_HEADER, FRAME_MESSAGE,
+    MAX_FRAME_SIZE, decode_message, encode_frame, encode_message, read_frame
+)
+
+class RecordingWriter:
+    """Stands in for a StreamWriter, keeping each write() call separately"""
+    def __init__(self, fail: bool = False):
+        self.writes = []
+        self.fail = fail
+        self.closed = False
+
+    def write(self, data: bytes):
+        if self.fail:
+            raise ConnectionResetError("peer went away")
+        self.writes.append(data)
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    async def wait_closed(self):
+        pass
+
+def test_frames_round_trip():
+    async def run():
+        message = Message("a", "b", "request", {'value': 1})
+        reader = asyncio.StreamReader()
+        reader.feed_data(encode_frame(FRAME_MESSAGE, "b", encode_message(message)))
+        reader.feed_data(encode_frame(FRAME_MESSAGE, "c", b''))
+        kind, route, body = await read_frame(reader)
+        assert (kind, route) == (FRAME_MESSAGE, "b")
+        assert decode_message(body).content == {'value': 1}
+        assert await read_frame(reader) == (FRAME_MESSAGE, "c", b'')
+
+        # An oversized length is rejected before its payload is read
+        reader = asyncio.StreamReader()
+        reader.feed_data(FRAME_HEADER.pack(MAX_FRAME_SIZE + 1, FRAME_MESSAGE, 0))
+        try:
+            await read_frame(reader)
+            assert False, "an oversized frame must be rejected"
+        except ValueError:
+            pass
+    asyncio.run(run())
+
+def test_writes_in_one_iteration_are_batched():
+    async def run():
+        writer = RecordingWriter()
+        peer = BatchedWriter(writer)
+        frames = [encode_frame(FRAME_MESSAGE, "b", bytes([i])) for i in range(3)]
+        for frame in frames:
+            peer.write(frame)
+        await peer.drain()
+        assert writer.writes == [b''.join(frames)]
+
+        # A failed socket write is reported, not lost with the flush task
+        peer = BatchedWriter(RecordingWriter(fail=True))
+        peer.write(frames[0])
+        try:
+            await peer.drain()
+            assert False, "a failed write must surface from drain()"
+        except ConnectionError:
+            pass
+        try:
+            peer.write(frames[1])
+            assert False, "writes after a failure must be refused"
+        except ConnectionError:
+            pass
+    asyncio.run(run())
+
+def test_pending_frames_expire_and_overflow():
+    async def run():
+        router = BusRouter("unused.sock", max_pending=2, pending_ttl=5.0)
+        for i in range(3):
+            router._route("late", encode_frame(FRAME_MESSAGE, "late", bytes([i])))
+        # The oldest frame made way for newer ones
+        assert len(router.pending["late"]) == 2
+        assert router.dropped == 1
+
+        oldest = router.pending["late"][0][0]
+        router._expire_pending(oldest + 5.0 + 1)
+        assert "late" not in router.pending
+        assert router.dropped == 3
+
+        # Frames still within their TTL reach the agent when it registers
+        router._route("slow", encode_frame(FRAME_MESSAGE, "slow", b'x'))
+        writer = RecordingWriter()
+        router._register("slow", BatchedWriter(writer))
+        await router.routes["slow"].drain()
+        assert writer.writes == [encode_frame(FRAME_MESSAGE, "slow", b'x')]
+    asyncio.run(run())
+
+def test_send_after_router_loss_raises():
+    async def run():
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "bus.sock")
+            router = BusRouter(path)
+            await router.start()
+            first = DistributedCommunicationBus(path)
+            second = DistributedCommunicationBus(path)
+            await first.connect()
+            await second.connect()
+            second.register_local_agent("b")
+            await second.flush()
+            await asyncio.sleep(0.05)
+
+            await first.send_message(Message("a", "b", "request", {'value': 1}))
+            await first.flush()
+            received = await asyncio.wait_for(second.get_messages("b"), 1.0)
+            assert received.content == {'value': 1}
+
+            await router.close()
+            await asyncio.sleep(0.05)
+            try:
+                await first.send_message(Message("a", "b", "request", {'value': 2}))
+                assert False, "sending without a router must fail"
+            except ConnectionError:
+                pass
+            try:
+                await first.flush()
+                assert False, "flushing without a router must fail"
+            except ConnectionError:
+                pass
+            await first.close()
+            await second.close()
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    test_frames_round_trip()
+    test_writes_in_one_iteration_are_batched()
+    test_pending_frames_expire_and_overflow()
+    test_send_after_router_loss_raises()
+    print("Transport tests passed")
@@ -19,11 +19,12 @@ class OpenAIAgent(AgentInterface):
         self.workflow_history.append(result)
         return result
         
-    def share_workflow(self) -> WorkflowData:
+    def share_workflow(self, since_version: int = 0) -> WorkflowData:
         return WorkflowData(
             workflow_id=f"openai_{self.model_name}",
-            steps=self.workflow_history,
-            metadata={'capabilities': self.capabilities}
+            steps=self.workflow_history[since_version:],
+            metadata={'capabilities': self.capabilities},
+            base_version=since_version
         )
         
     def receive_workflow(self, workflow_data: WorkflowData) -> None:
@@ -0,0 +1,252 @@
+from typing import Dict, Any, List, NamedTuple, Optional
+import json
+import logging
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+class SpanContext(NamedTuple):
+    trace_id: str
+    span_id: str
+    sampled: bool
+
+class Span:
+    __slots__ = ('name', 'context', 'parent_id', 'start_ns', 'end_ns', 'attributes', 'error')
+
+    def __init__(self, name: str, context: SpanContext, parent_id: Optional[str], start_ns: int, attributes: Dict[str, Any]):
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.start_ns = start_ns
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        if self.context.sampled:
+            self.attributes[key] = value
+
+    @property
+    def duration_ns(self) -> int:
+        return (self.end_ns or time.monotonic_ns()) - self.start_ns
+
+_current_span: ContextVar[Optional[Span]] = ContextVar('current_span', default=None)
+
+# Shared by every span of an unsampled trace, so skipping a trace allocates nothing
+_UNSAMPLED = Span('unsampled', SpanContext('0' * 32, '0' * 16, False), None, 0, {})
+
+# Parent for work that should record no spans, e.g. background writes no trace asked for
+UNSAMPLED_CONTEXT = _UNSAMPLED.context
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+class Tracer:
+    """Records timed spans with parent/child links, sampled per trace at the root.
+
+    The current span lives in a context variable, so it follows asyncio
+    tasks and anything run through contextvars.copy_context(). Children
+    inherit the root's sampling decision; spans of an unsampled trace share
+    one placeholder and are never recorded.
+    Timings use the monotonic clock and are anchored to wall time on export.
+    Context crosses process boundaries as a W3C traceparent header.
+
+    Sampling is off by default, since finished spans are kept until someone
+    calls drain() or export(); turn it on with configure(sample_rate=...)
+    only where those are called. Traces sampled by a remote parent are
+    still recorded.
+    """
+    def __init__(self, sample_rate: float = 0.0, max_spans: int = 100000, service_name: str = "orchestrator"):
+        self.sample_rate = sample_rate
+        self.service_name = service_name
+        self.finished: deque = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+        # Pairs a monotonic reading with wall time so exported spans carry Unix timestamps
+        self._monotonic_anchor = time.monotonic_ns()
+        self._wall_anchor = time.time_ns()
+        self.logger = logging.getLogger(__name__)
+
+    def configure(self, sample_rate: Optional[float] = None, max_spans: Optional[int] = None):
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        if max_spans is not None:
+            with self._lock:
+                self.finished = deque(self.finished, maxlen=max_spans)
+
+    def current_context(self) -> Optional[SpanContext]:
+        span = _current_span.get()
+        return span.context if span is not None else None
+
+    def _open(self, name: str, parent: Optional[SpanContext], attributes: Dict[str, Any], start_ns: int) -> Span:
+        if parent is None:
+            if random.random() >= self.sample_rate:
+                return _UNSAMPLED
+            return Span(name, SpanContext(_new_id(128), _new_id(64), True), None, start_ns, attributes)
+        if not parent.sampled:
+            return _UNSAMPLED
+        return Span(name, SpanContext(parent.trace_id, _new_id(64), True), parent.span_id, start_ns, attributes)
+
+    def _finish(self, span: Span):
+        if span is not _UNSAMPLED:
+            with self._lock:
+                self.finished.append(span)
+
+    def span(self, name: str, parent: Optional[SpanContext] = None, **attributes) -> '_SpanScope':
+        """Time a with-block as a child of parent, or of the current span when no parent is given"""
+        return _SpanScope(self, name, parent, attributes)
+
+    def record_span(
+        self,
+        name: str,
+        start_unix_ns: int,
+        end_unix_ns: int,
+        parent: Optional[SpanContext] = None,
+        **attributes
+    ) -> Span:
+        """Record an interval measured elsewhere, such as time spent waiting in a queue"""
+        offset = self._monotonic_anchor - self._wall_anchor
+        span = self._open(name, parent if parent is not None else self.current_context(), attributes, start_unix_ns + offset)
+        if span is not _UNSAMPLED:
+            span.end_ns = end_unix_ns + offset
+            self._finish(span)
+        return span
+
+    def inject(self, context: Optional[SpanContext] = None) -> Optional[Dict[str, str]]:
+        """Serialise the current (or given) span context for a message or queue payload"""
+        context = context or self.current_context()
+        if context is None:
+            return None
+        return {'traceparent': f"00-{context.trace_id}-{context.span_id}-{'01' if context.sampled else '00'}"}
+
+    @staticmethod
+    def extract(carrier: Optional[Dict[str, str]]) -> Optional[SpanContext]:
+        if not carrier or 'traceparent' not in carrier:
+            return None
+        try:
+            _, trace_id, span_id, flags = carrier['traceparent'].split('-')
+            return SpanContext(trace_id, span_id, int(flags, 16) & 1 == 1)
+        except ValueError:
+            return None
+
+    def drain(self) -> List[Span]:
+        with self._lock:
+            spans = list(self.finished)
+            self.finished.clear()
+        return spans
+
+    def _unix_ns(self, monotonic_ns: int) -> int:
+        return self._wall_anchor + (monotonic_ns - self._monotonic_anchor)
+
+    def to_otlp(self, spans: List[Span]) -> Dict[str, Any]:
+        """Build an OTLP/JSON ExportTraceServiceRequest for the given spans"""
+        return {
+            'resourceSpans': [{
+                'resource': {'attributes': [
+                    {'key': 'service.name', 'value': {'stringValue': self.service_name}}
+                ]},
+                'scopeSpans': [{
+                    'scope': {'name': __name__},
+                    'spans': [
+                        {
+                            'traceId': span.context.trace_id,
+                            'spanId': span.context.span_id,
+                            'parentSpanId': span.parent_id or '',
+                            'name': span.name,
+                            'kind': 1,
+                            'startTimeUnixNano': str(self._unix_ns(span.start_ns)),
+                            'endTimeUnixNano': str(self._unix_ns(span.end_ns)),
+                            'attributes': [
+                                {'key': key, 'value': _otlp_value(value)} for key, value in span.attributes.items()
+                            ],
+                            'status': {'code': 2, 'message': span.error} if span.error else {'code': 1}
+                        }
+                        for span in spans
+                    ]
+                }]
+            }]
+        }
+
+    def export(self, path: str) -> int:
+        """Append finished spans to path as one OTLP/JSON request per line, returning how many"""
+        spans = self.drain()
+        if spans:
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(self.to_otlp(spans)) + "\n")
+        return len(spans)
+
+    def workflow_breakdown(self, spans: Optional[List[Span]] = None) -> Dict[str, Dict[str, Any]]:
+        """Summarise where each workflow's time went, by span name.
+
+        Traces are keyed by the workflow.id attribute of their root span.
+        Phases report count, total and maximum milliseconds; concurrent
+        children overlap, so their totals can exceed the workflow's own.
+        """
+        if spans is None:
+            with self._lock:
+                spans = list(self.finished)
+        roots: Dict[str, Span] = {}
+        by_trace: Dict[str, List[Span]] = {}
+        for span in spans:
+            by_trace.setdefault(span.context.trace_id, []).append(span)
+            if span.parent_id is None:
+                roots[span.context.trace_id] = span
+
+        report = {}
+        for trace_id, root in roots.items():
+            workflow_id = root.attributes.get('workflow.id', trace_id)
+            phases: Dict[str, Dict[str, float]] = {}
+            for span in by_trace[trace_id]:
+                if span is root:
+                    continue
+                phase = phases.setdefault(span.name, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+                duration_ms = span.duration_ns / 1e6
+                phase['count'] += 1
+                phase['total_ms'] += duration_ms
+                phase['max_ms'] = max(phase['max_ms'], duration_ms)
+            report[workflow_id] = {
+                'trace_id': trace_id,
+                'total_ms': root.duration_ns / 1e6,
+                'error': root.error,
+                'phases': phases
+            }
+        return report
+
+class _SpanScope:
+    """Context manager returned by Tracer.span; a class rather than a generator to keep it cheap"""
+    __slots__ = ('tracer', 'name', 'parent', 'attributes', 'span', 'token')
+
+    def __init__(self, tracer: Tracer, name: str, parent: Optional[SpanContext], attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.parent = parent
+        self.attributes = attributes
+
+    def __enter__(self) -> Span:
+        parent = self.parent if self.parent is not None else self.tracer.current_context()
+        self.span = self.tracer._open(self.name, parent, self.attributes, time.monotonic_ns())
+        self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        span = self.span
+        _current_span.reset(self.token)
+        if span is not _UNSAMPLED:
+            span.end_ns = time.monotonic_ns()
+            if exc_type is not None:
+                span.error = f"{exc_type.__name__}: {exc}"
+            self.tracer._finish(span)
+        return False
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+# Process-wide tracer shared by the instrumented components
+tracer = Tracer()
@@ -4,6 +4,7 @@ from datetime import datetime
 import pytz
 from pydantic import BaseModel, validator
 from redis import asyncio as aioredis
+from ..core.tracing import tracer
 
 class DataTransformer:
     def __init__(self):
@@ -17,17 +18,18 @@ class DataTransformer:
         target_agent: str
     ) -> Dict[str, Any]:
         """Transform data between agents"""
-        source_schema = self.schema_registry[source_agent]
-        target_schema = self.schema_registry[target_agent]
-        
-        # Apply transformation rules
-        transformed = await self._apply_rules(
-            data,
-            source_schema,
-            target_schema
-        )
-        
-        return transformed
+        with tracer.span("transform.data", source_agent=source_agent, target_agent=target_agent, fields=len(data)):
+            source_schema = self.schema_registry[source_agent]
+            target_schema = self.schema_registry[target_agent]
+            
+            # Apply transformation rules
+            transformed = await self._apply_rules(
+                data,
+                source_schema,
+                target_schema
+            )
+            
+            return transformed
         
     async def _apply_rules(
         self,
@@ -51,12 +53,15 @@ class DataConsistencyManager:
         
     async def acquire_lock(self, resource_id: str) -> bool:
         """Acquire distributed lock for resource"""
-        return await self.redis.set(
-            f"lock:{resource_id}",
-            "1",
-            ex=self.lock_timeout,
-            nx=True
-        )
+        with tracer.span("lock.acquire", resource_id=resource_id) as span:
+            acquired = await self.redis.set(
+                f"lock:{resource_id}",
+                "1",
+                ex=self.lock_timeout,
+                nx=True
+            )
+            span.set_attribute("acquired", bool(acquired))
+            return acquired
         
     async def release_lock(self, resource_id: str):
         """Release distributed lock"""
@@ -0,0 +1,287 @@
+from typing import Deque, Dict, List, Optional, Set, Tuple
+import asyncio
+import json
+import logging
+import struct
+import time
+from collections import deque
+from datetime import datetime
+from .communication import CommunicationBus, Message
+from .tracing import tracer
+
+# Frame layout: total length (uint32) | kind (uint8) | route length (uint16) | route | body
+FRAME_HEADER = struct.Struct('!IBH')
+FRAME_REGISTER = 1
+FRAME_MESSAGE = 2
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+def encode_frame(kind: int, route: str, body: bytes) -> bytes:
+    """Encode a length-prefixed binary frame"""
+    route_bytes = route.encode('utf-8')
+    length = FRAME_HEADER.size - 4 + len(route_bytes) + len(body)
+    return FRAME_HEADER.pack(length, kind, len(route_bytes)) + route_bytes + body
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[int, str, bytes]:
+    """Read one frame, returning (kind, route, body)"""
+    header = await reader.readexactly(FRAME_HEADER.size)
+    length, kind, route_length = FRAME_HEADER.unpack(header)
+    if length > MAX_FRAME_SIZE:
+        raise ValueError(f"Frame of {length} bytes exceeds the {MAX_FRAME_SIZE} byte limit")
+    payload = await reader.readexactly(length - (FRAME_HEADER.size - 4))
+    return kind, payload[:route_length].decode('utf-8'), payload[route_length:]
+
+def encode_message(message: Message) -> bytes:
+    return json.dumps({
+        'sender_id': message.sender_id,
+        'receiver_id': message.receiver_id,
+        'message_type': message.message_type,
+        'content': message.content,
+        'timestamp': message.timestamp.isoformat(),
+        'trace_context': message.trace_context
+    }, default=str).encode('utf-8')
+
+def decode_message(body: bytes) -> Message:
+    data = json.loads(body)
+    data['timestamp'] = datetime.fromisoformat(data['timestamp'])
+    return Message(**data)
+
+class BatchedWriter:
+    """Coalesces frames written in the same loop iteration into a single socket write.
+
+    A failed socket write is kept and raised as ConnectionError by every
+    later write() and drain(), so lost frames are never reported as sent.
+    """
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.error: Optional[Exception] = None
+        self._pending: List[bytes] = []
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def write(self, frame: bytes):
+        if self.error is not None:
+            raise ConnectionError(f"Bus connection failed: {self.error}")
+        self._pending.append(frame)
+        if self._flush_task is None:
+            self._flush_task = asyncio.ensure_future(self._flush())
+
+    async def _flush(self):
+        try:
+            while self._pending:
+                batch, self._pending = self._pending, []
+                self.writer.write(b''.join(batch))
+                await self.writer.drain()
+        except Exception as e:
+            self.error = e
+            self._pending = []
+        finally:
+            self._flush_task = None
+
+    async def drain(self):
+        """Wait until every queued frame has been handed to the socket"""
+        if self._flush_task is not None:
+            await asyncio.shield(self._flush_task)
+        if self.error is not None:
+            raise ConnectionError(f"Bus connection failed: {self.error}") from self.error
+
+    async def close(self):
+        try:
+            await self.drain()
+        finally:
+            self.writer.close()
+            await self.writer.wait_closed()
+
+class BusRouter:
+    """Routes message frames between processes by receiver agent_id.
+
+    Frames for an agent whose process has not attached yet are held for up
+    to pending_ttl seconds, at most max_pending per agent; older frames are
+    dropped and counted so an agent that never registers cannot grow the
+    router without bound.
+    """
+    def __init__(self, socket_path: str, max_pending: int = 1000, pending_ttl: float = 60.0):
+        self.socket_path = socket_path
+        self.max_pending = max_pending
+        self.pending_ttl = pending_ttl
+        self.routes: Dict[str, BatchedWriter] = {}
+        self.connections: Set[BatchedWriter] = set()
+        self.pending: Dict[str, Deque[Tuple[float, bytes]]] = {}
+        self.dropped = 0
+        self._next_expiry = 0.0
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.logger = logging.getLogger(__name__)
+
+    async def start(self):
+        self.server = await asyncio.start_unix_server(self._handle_connection, path=self.socket_path)
+        self.logger.info(f"Bus router listening on {self.socket_path}")
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        # Includes processes that only send and so never appear in routes
+        for peer in list(self.connections):
+            try:
+                await peer.close()
+            except ConnectionError:
+                pass
+        self.routes.clear()
+        self.connections.clear()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        peer = BatchedWriter(writer)
+        self.connections.add(peer)
+        try:
+            while True:
+                kind, route, body = await read_frame(reader)
+                if kind == FRAME_REGISTER:
+                    self._register(route, peer)
+                elif kind == FRAME_MESSAGE:
+                    self._route(route, encode_frame(kind, route, body))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.connections.discard(peer)
+            for agent_id in [a for a, p in self.routes.items() if p is peer]:
+                del self.routes[agent_id]
+            writer.close()
+
+    def _register(self, agent_id: str, peer: BatchedWriter):
+        if agent_id in self.routes and self.routes[agent_id] is not peer:
+            self.logger.warning(f"Agent {agent_id} moved to a new process")
+        self.routes[agent_id] = peer
+        # Deliver anything sent before the agent's process attached
+        cutoff = time.monotonic() - self.pending_ttl
+        for queued_at, frame in self.pending.pop(agent_id, ()):
+            if queued_at >= cutoff:
+                peer.write(frame)
+            else:
+                self.dropped += 1
+
+    def _route(self, agent_id: str, frame: bytes):
+        peer = self.routes.get(agent_id)
+        if peer is not None:
+            try:
+                peer.write(frame)
+                return
+            except ConnectionError:
+                # The agent's process is going away; hold the frame as if it never attached
+                del self.routes[agent_id]
+        now = time.monotonic()
+        queue = self.pending.get(agent_id)
+        if queue is None:
+            queue = self.pending[agent_id] = deque(maxlen=self.max_pending)
+        if len(queue) == self.max_pending:
+            self.dropped += 1
+        queue.append((now, frame))
+        if now >= self._next_expiry:
+            self._expire_pending(now)
+
+    def _expire_pending(self, now: float):
+        """Drop frames held longer than pending_ttl; runs at most once per second"""
+        self._next_expiry = now + 1.0
+        cutoff = now - self.pending_ttl
+        expired = 0
+        for agent_id, queue in list(self.pending.items()):
+            while queue and queue[0][0] < cutoff:
+                queue.popleft()
+                expired += 1
+            if not queue:
+                del self.pending[agent_id]
+        if expired:
+            self.dropped += expired
+            self.logger.warning(f"Dropped {expired} frames for agents that never attached")
+
+class DistributedCommunicationBus(CommunicationBus):
+    """CommunicationBus whose mailboxes can live in other processes on the same host.
+
+    Agents that call ``subscribe`` or ``get_messages`` on this bus are hosted
+    locally; messages for any other agent are forwarded through a BusRouter.
+    If the router connection drops, sends to remote agents raise
+    ConnectionError until ``connect`` succeeds again.
+    """
+    def __init__(self, socket_path: str):
+        super().__init__()
+        self.socket_path = socket_path
+        self.local_agents: Set[str] = set()
+        self.peer: Optional[BatchedWriter] = None
+        self.connection_lost = False
+        self._reader_task: Optional[asyncio.Task] = None
+        self.logger = logging.getLogger(__name__)
+
+    async def connect(self):
+        reader, writer = await asyncio.open_unix_connection(self.socket_path)
+        self.peer = BatchedWriter(writer)
+        self.connection_lost = False
+        for agent_id in self.local_agents:
+            self.peer.write(encode_frame(FRAME_REGISTER, agent_id, b''))
+        self._reader_task = asyncio.ensure_future(self._read_loop(reader))
+
+    async def close(self):
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+        if self.peer is not None:
+            try:
+                await self.peer.close()
+            except ConnectionError:
+                pass
+            self.peer = None
+
+    def register_local_agent(self, agent_id: str):
+        """Claim the mailbox for an agent hosted in this process"""
+        if agent_id in self.local_agents:
+            return
+        self.local_agents.add(agent_id)
+        if self.peer is not None:
+            try:
+                self.peer.write(encode_frame(FRAME_REGISTER, agent_id, b''))
+            except ConnectionError:
+                # connect() registers every local agent again
+                pass
+
+    async def send_message(self, message: Message):
+        """Send a message to a specific agent, in this process or another"""
+        if message.receiver_id in self.local_agents or (self.peer is None and not self.connection_lost):
+            await super().send_message(message)
+            return
+        if self.peer is None:
+            raise ConnectionError(f"Lost connection to bus router at {self.socket_path}")
+        if message.trace_context is None:
+            message.trace_context = tracer.inject()
+        self.peer.write(encode_frame(FRAME_MESSAGE, message.receiver_id, encode_message(message)))
+
+    def subscribe(self, agent_id: str, callback):
+        self.register_local_agent(agent_id)
+        super().subscribe(agent_id, callback)
+
+    async def get_messages(self, agent_id: str) -> Message:
+        self.register_local_agent(agent_id)
+        return await super().get_messages(agent_id)
+
+    async def flush(self):
+        """Wait until all outgoing frames have been written"""
+        if self.peer is not None:
+            await self.peer.drain()
+        elif self.connection_lost:
+            raise ConnectionError(f"Lost connection to bus router at {self.socket_path}")
+
+    async def _read_loop(self, reader: asyncio.StreamReader):
+        try:
+            while True:
+                kind, _, body = await read_frame(reader)
+                if kind != FRAME_MESSAGE:
+                    continue
+                # A bad frame or a failing subscriber must not stop delivery of later messages
+                try:
+                    await super().send_message(decode_message(body))
+                except Exception as e:
+                    self.logger.error(f"Failed to deliver message from bus router: {str(e)}")
+        except (asyncio.IncompleteReadError, ConnectionError):
+            self.logger.warning(f"Lost connection to bus router at {self.socket_path}")
+        except ValueError as e:
+            # An oversized frame leaves the stream unaligned, so the connection can't be reused
+            self.logger.error(f"Dropping connection to bus router at {self.socket_path}: {str(e)}")
+        # Later sends must fail rather than write into a dead socket
+        if self.peer is not None:
+            self.peer.writer.close()
+            self.peer = None
+        self.connection_lost = True
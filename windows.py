@@ -0,0 +1,105 @@
+from typing import Callable, Dict, Iterable, Optional
+import math
+import threading
+import time
+import numpy as np
+from .quantiles import LatencyHistogram
+
+def empty_summary() -> Dict[str, float]:
+    return {'count': 0, 'throughput': 0.0, 'error_rate': 0.0, 'mean': 0.0, 'p50': 0.0, 'p90': 0.0, 'p99': 0.0}
+
+class SlidingWindow:
+    """Task outcomes over the last horizon seconds, in a circular array of time buckets.
+
+    Each bucket covers bucket_seconds and holds a task count, an error
+    count, a duration sum and a coarse latency histogram. A bucket is
+    cleared when the clock comes round to it again, so memory is fixed and
+    a query over any window up to the horizon sums at most horizon /
+    bucket_seconds rows.
+    """
+    def __init__(
+        self,
+        horizon: float = 900.0,
+        bucket_seconds: float = 5.0,
+        relative_error: float = 0.05,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.bucket_seconds = bucket_seconds
+        self.slots = int(math.ceil(horizon / bucket_seconds))
+        self.clock = clock
+        # Only used for its bucket layout; every time bucket shares it
+        self.layout = LatencyHistogram(relative_error=relative_error)
+        self.epochs = np.full(self.slots, -1, dtype=np.int64)
+        self.counts = np.zeros(self.slots, dtype=np.int64)
+        self.errors = np.zeros(self.slots, dtype=np.int64)
+        self.duration_sums = np.zeros(self.slots, dtype=np.float64)
+        self.latency = np.zeros((self.slots, self.layout.bucket_count), dtype=np.int32)
+        self._lock = threading.Lock()
+
+    def _epoch(self, now: Optional[float]) -> int:
+        return int((self.clock() if now is None else now) // self.bucket_seconds)
+
+    def record(self, duration: float, error: bool, now: Optional[float] = None):
+        epoch = self._epoch(now)
+        slot = epoch % self.slots
+        with self._lock:
+            if self.epochs[slot] != epoch:
+                # The slot last held a bucket from a full horizon ago
+                self.epochs[slot] = epoch
+                self.counts[slot] = 0
+                self.errors[slot] = 0
+                self.duration_sums[slot] = 0.0
+                self.latency[slot] = 0
+            self.counts[slot] += 1
+            self.errors[slot] += error
+            self.duration_sums[slot] += duration
+            self.latency[slot, self.layout.bucket_index(duration)] += 1
+
+    def summary(self, window: float, now: Optional[float] = None) -> Dict[str, float]:
+        """Throughput per second, error rate and latency percentiles over the last window seconds"""
+        epoch = self._epoch(now)
+        buckets = min(self.slots, max(1, int(math.ceil(window / self.bucket_seconds))))
+        with self._lock:
+            live = self.epochs > epoch - buckets
+            count = int(self.counts[live].sum())
+            errors = int(self.errors[live].sum())
+            duration_sum = float(self.duration_sums[live].sum())
+            latency = self.latency[live].sum(axis=0) if count else None
+
+        summary = empty_summary()
+        summary['count'] = count
+        summary['throughput'] = count / (buckets * self.bucket_seconds)
+        if count:
+            summary['error_rate'] = errors / count
+            summary['mean'] = duration_sum / count
+            cumulative = np.cumsum(latency)
+            for name, q in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99)):
+                rank = max(1, int(math.ceil(q * count)))
+                summary[name] = self.layout.bucket_value(int(np.searchsorted(cumulative, rank)))
+        return summary
+
+class WindowedMetrics:
+    """Per-agent sliding windows reported at several spans, 1, 5 and 15 minutes by default"""
+    def __init__(self, windows: Iterable[float] = (60.0, 300.0, 900.0), bucket_seconds: float = 5.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.windows = tuple(windows)
+        self.bucket_seconds = bucket_seconds
+        self.clock = clock
+        self.agents: Dict[str, SlidingWindow] = {}
+
+    def record(self, agent_id: str, duration: float, error: bool):
+        window = self.agents.get(agent_id)
+        if window is None:
+            window = self.agents[agent_id] = SlidingWindow(max(self.windows), self.bucket_seconds, clock=self.clock)
+        window.record(duration, error)
+
+    def get_window(self, agent_id: str, seconds: float) -> Dict[str, float]:
+        window = self.agents.get(agent_id)
+        return window.summary(seconds) if window is not None else empty_summary()
+
+    def snapshot(self, agent_id: str) -> Dict[str, Dict[str, float]]:
+        """Summaries for every configured window, keyed like '1m' or '15m'"""
+        return {_window_label(seconds): self.get_window(agent_id, seconds) for seconds in self.windows}
+
+def _window_label(seconds: float) -> str:
+    return f"{seconds / 60:g}m" if seconds >= 60 else f"{seconds:g}s"
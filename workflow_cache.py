@@ -0,0 +1,179 @@
+from typing import Dict, Any, List, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import Executor
+import asyncio
+import json
+from ..core.interfaces import WorkflowData
+from ..storage.persistence import WorkflowStorage
+
+def estimate_size(value: Any) -> int:
+    """Approximate the resident size of a JSON-like value by its encoded length"""
+    return len(json.dumps(value, default=str))
+
+class WorkflowCache:
+    """Workflow cache bounded by entry count and approximate byte size.
+
+    Evicts least recently ('lru') or least frequently ('lfu') used entries,
+    optionally spilling them to WorkflowStorage, and reads through to the
+    storage on a miss. The *_async methods run those reads and spills on
+    executor (the loop's default when None), so callers on the event loop
+    never wait on storage I/O.
+    """
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: int = 64 * 1024 * 1024,
+        policy: str = 'lru',
+        storage: Optional[WorkflowStorage] = None,
+        spill_on_evict: bool = True,
+        executor: Optional[Executor] = None
+    ):
+        if policy not in ('lru', 'lfu'):
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.storage = storage
+        self.spill_on_evict = spill_on_evict
+        self.executor = executor
+        # workflow_id -> (workflow, agent_id, approximate size)
+        self._entries: 'OrderedDict[str, Tuple[WorkflowData, str, int]]' = OrderedDict()
+        self._frequencies: Dict[str, int] = {}
+        # Evicted entries waiting to be written to storage
+        self._spills: List[Tuple[WorkflowData, str]] = []
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, workflow_id: str) -> bool:
+        return workflow_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, workflow_id: str) -> Optional[WorkflowData]:
+        """Return a cached workflow, loading it from storage on a miss"""
+        workflow = self._lookup(workflow_id)
+        if workflow is not None or self.storage is None:
+            return workflow
+        data = self.storage.get_workflow(workflow_id)
+        if data is None:
+            return None
+        workflow = WorkflowData(**data)
+        self.put(workflow)
+        return workflow
+
+    async def get_async(self, workflow_id: str) -> Optional[WorkflowData]:
+        """Like get, but a miss reads storage on the executor"""
+        workflow = self._lookup(workflow_id)
+        if workflow is not None or self.storage is None:
+            return workflow
+        data = await asyncio.get_running_loop().run_in_executor(
+            self.executor, self.storage.get_workflow, workflow_id
+        )
+        # Another task may have cached a newer copy while the read was in flight
+        if workflow_id in self._entries:
+            return self._entries[workflow_id][0]
+        if data is None:
+            return None
+        workflow = WorkflowData(**data)
+        await self.put_async(workflow)
+        return workflow
+
+    def _lookup(self, workflow_id: str) -> Optional[WorkflowData]:
+        if workflow_id in self._entries:
+            self.hits += 1
+            self._touch(workflow_id)
+            return self._entries[workflow_id][0]
+        self.misses += 1
+        return None
+
+    def put(self, workflow: WorkflowData, agent_id: Optional[str] = None):
+        self._insert(workflow, agent_id)
+        self._spill()
+
+    async def put_async(self, workflow: WorkflowData, agent_id: Optional[str] = None):
+        self._insert(workflow, agent_id)
+        await self._spill_async()
+
+    def _insert(self, workflow: WorkflowData, agent_id: Optional[str]):
+        if workflow.workflow_id in self._entries:
+            self._discard(workflow.workflow_id)
+        size = estimate_size(workflow.__dict__)
+        self._entries[workflow.workflow_id] = (workflow, agent_id, size)
+        self._frequencies[workflow.workflow_id] = 1
+        self.resident_bytes += size
+        self._evict(keep=workflow.workflow_id)
+
+    def grow(self, workflow_id: str, added_bytes: int, agent_id: Optional[str] = None):
+        """Account for steps appended to a cached workflow in place"""
+        self._grow(workflow_id, added_bytes, agent_id)
+        self._spill()
+
+    async def grow_async(self, workflow_id: str, added_bytes: int, agent_id: Optional[str] = None):
+        self._grow(workflow_id, added_bytes, agent_id)
+        await self._spill_async()
+
+    def _grow(self, workflow_id: str, added_bytes: int, agent_id: Optional[str]):
+        if workflow_id not in self._entries:
+            return
+        workflow, known_agent_id, size = self._entries[workflow_id]
+        self._entries[workflow_id] = (workflow, agent_id or known_agent_id, size + added_bytes)
+        self.resident_bytes += added_bytes
+        self._touch(workflow_id)
+        self._evict(keep=workflow_id)
+
+    def _touch(self, workflow_id: str):
+        self._entries.move_to_end(workflow_id)
+        self._frequencies[workflow_id] += 1
+
+    def _discard(self, workflow_id: str) -> Tuple[WorkflowData, str, int]:
+        entry = self._entries.pop(workflow_id)
+        del self._frequencies[workflow_id]
+        self.resident_bytes -= entry[2]
+        return entry
+
+    def _evict(self, keep: str):
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries or self.resident_bytes > self.max_bytes
+        ):
+            # Never evict the entry that is being written
+            candidates = (w for w in self._entries if w != keep)
+            if self.policy == 'lru':
+                victim = next(candidates)
+            else:
+                victim = min(candidates, key=self._frequencies.__getitem__)
+            workflow, agent_id, _ = self._discard(victim)
+            self.evictions += 1
+            # Entries read through from storage and never updated have no agent_id to save
+            if self.spill_on_evict and self.storage is not None and agent_id is not None:
+                self._spills.append((workflow, agent_id))
+
+    def _spill(self):
+        spills, self._spills = self._spills, []
+        for workflow, agent_id in spills:
+            self.storage.save_workflow(workflow, agent_id)
+
+    async def _spill_async(self):
+        spills, self._spills = self._spills, []
+        # A write-behind queue accepts submissions on the loop and only blocks when full
+        submit = getattr(self.storage, 'submit_workflow_async', None)
+        for workflow, agent_id in spills:
+            if submit is not None:
+                await submit(workflow, agent_id)
+            else:
+                await asyncio.get_running_loop().run_in_executor(
+                    self.executor, self.storage.save_workflow, workflow, agent_id
+                )
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'resident_bytes': self.resident_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions
+        }
@@ -1,41 +1,156 @@
-from typing import Dict, List, Any
+from typing import Dict, Any, Optional, Set, Tuple
 import asyncio
 from ..core.interfaces import WorkflowData
 from ..core.event_bus import EventBus
+from ..utils.exceptions import WorkflowResyncRequired
+from .workflow_cache import WorkflowCache, estimate_size
 
 class WorkflowSharingManager:
-    def __init__(self, event_bus: EventBus):
+    def __init__(
+        self,
+        event_bus: EventBus,
+        coalesce_window: float = 0.0,
+        coalesce_max_updates: int = 1,
+        workflow_cache: Optional[WorkflowCache] = None
+    ):
         self.event_bus = event_bus
-        self.workflow_cache: Dict[str, WorkflowData] = {}
-        self.subscriptions: Dict[str, List[str]] = {}
+        self.workflow_cache = workflow_cache if workflow_cache is not None else WorkflowCache()
+        # Followers of each agent, and the agents each subscriber follows
+        self.subscriptions: Dict[str, Set[str]] = {}
+        self.following: Dict[str, Set[str]] = {}
+        # Last workflow version delivered to each (subscriber, workflow_id)
+        self.delivered_versions: Dict[Tuple[str, str], int] = {}
+        # Updates for the same workflow_id are merged until the window expires
+        # or coalesce_max_updates updates have been received for it
+        self.coalesce_window = coalesce_window
+        self.coalesce_max_updates = coalesce_max_updates
+        self._pending: Dict[str, str] = {}
+        self._pending_counts: Dict[str, int] = {}
+        # Workflows replaced by a full snapshot since their last flush, e.g. after
+        # an agent restart; versions delivered before then no longer apply
+        self._replaced: Set[str] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+        self.updates_received = 0
+        self.updates_flushed = 0
+        self.workflow_flushes = 0
+        self.notifications_sent = 0
+        self.publishes = 0
 
     async def share_workflow(self, workflow: WorkflowData, source_agent_id: str):
-        # Store in cache
-        self.workflow_cache[workflow.workflow_id] = workflow
-        
-        # Notify subscribers
-        message = {
-            'type': 'workflow_update',
-            'source_agent': source_agent_id,
-            'workflow_id': workflow.workflow_id,
-            'workflow_data': workflow.__dict__
-        }
-        
-        # Publish to relevant subscribers
-        for agent_id in self.subscriptions.get(source_agent_id, []):
-            await self._notify_agent(agent_id, message)
+        # Merge into the cached copy; the workflow may be a delta
+        cached = await self.workflow_cache.get_async(workflow.workflow_id)
+        if cached is None:
+            # Without storage behind the cache an evicted workflow is gone for good
+            if workflow.is_delta:
+                raise WorkflowResyncRequired(
+                    f"Received a delta for unknown workflow {workflow.workflow_id}; a full snapshot is required"
+                )
+            cached = WorkflowData(workflow.workflow_id, [], {})
+            cached.apply_delta(workflow)
+            await self.workflow_cache.put_async(cached, source_agent_id)
+        else:
+            cached.apply_delta(workflow)
+            await self.workflow_cache.grow_async(workflow.workflow_id, estimate_size(workflow.steps), source_agent_id)
+        if not workflow.is_delta:
+            self._replaced.add(workflow.workflow_id)
+        self.updates_received += 1
+
+        # Only the latest state of a workflow is worth publishing
+        self._pending[workflow.workflow_id] = source_agent_id
+        count = self._pending_counts.get(workflow.workflow_id, 0) + 1
+        self._pending_counts[workflow.workflow_id] = count
+
+        if count >= self.coalesce_max_updates:
+            await self._flush_workflow(workflow.workflow_id)
+        elif self.coalesce_window > 0 and self._flush_task is None:
+            self._flush_task = asyncio.ensure_future(self._flush_after(self.coalesce_window))
+
+    async def flush(self):
+        """Publish every pending workflow update now"""
+        if self._flush_task is not None and self._flush_task is not asyncio.current_task():
+            self._flush_task.cancel()
+        self._flush_task = None
+        for workflow_id in list(self._pending):
+            await self._flush_workflow(workflow_id)
+
+    async def _flush_after(self, delay: float):
+        await asyncio.sleep(delay)
+        await self.flush()
+
+    async def _flush_workflow(self, workflow_id: str):
+        if workflow_id not in self._pending:
+            return
+        source_agent_id = self._pending.pop(workflow_id)
+        self.updates_flushed += self._pending_counts.pop(workflow_id)
+        self.workflow_flushes += 1
+        replaced = workflow_id in self._replaced
+        self._replaced.discard(workflow_id)
+        workflow = await self.workflow_cache.get_async(workflow_id)
+        if workflow is None:
+            return
+
+        # Group subscribers by the version they last saw; normally that is a single group.
+        # After a replacement everyone gets a full snapshot, even if it is shorter
+        targets_by_version: Dict[int, Set[str]] = {}
+        for agent_id in self.subscriptions.get(source_agent_id, ()):
+            seen = 0 if replaced else self.delivered_versions.get((agent_id, workflow_id), 0)
+            if replaced or seen < workflow.version:
+                targets_by_version.setdefault(seen, set()).add(agent_id)
 
-    async def _notify_agent(self, agent_id: str, message: Dict[str, Any]):
-        # Implement actual notification logic
+        for seen, targets in targets_by_version.items():
+            # Built once and shared by every target in the group
+            message = {
+                'type': 'workflow_update',
+                'source_agent': source_agent_id,
+                'workflow_id': workflow_id,
+                'workflow_data': workflow.since(seen).__dict__
+            }
+            for agent_id in targets:
+                self.delivered_versions[(agent_id, workflow_id)] = workflow.version
+            self._publish(frozenset(targets), message)
+
+    def _publish(self, target_agents: frozenset, message: Dict[str, Any]):
+        self.publishes += 1
+        self.notifications_sent += len(target_agents)
         self.event_bus.publish('workflow_update', {
-            'target_agent': agent_id,
+            'target_agents': target_agents,
             'message': message
         })
 
+    def get_coalesce_stats(self) -> Dict[str, Any]:
+        """Report how many updates were merged into each published notification"""
+        return {
+            'updates_received': self.updates_received,
+            'workflow_flushes': self.workflow_flushes,
+            'notifications_sent': self.notifications_sent,
+            'publishes': self.publishes,
+            'pending_workflows': len(self._pending),
+            'coalesce_ratio': self.updates_flushed / self.workflow_flushes if self.workflow_flushes else 0.0
+        }
+
     def subscribe_to_agent(self, subscriber_id: str, target_agent_id: str):
-        if target_agent_id not in self.subscriptions:
-            self.subscriptions[target_agent_id] = []
-        self.subscriptions[target_agent_id].append(subscriber_id)
+        self.subscriptions.setdefault(target_agent_id, set()).add(subscriber_id)
+        self.following.setdefault(subscriber_id, set()).add(target_agent_id)
+
+    def unsubscribe_from_agent(self, subscriber_id: str, target_agent_id: str):
+        self.subscriptions.get(target_agent_id, set()).discard(subscriber_id)
+        self.following.get(subscriber_id, set()).discard(target_agent_id)
+
+    def get_subscribers(self, target_agent_id: str) -> Set[str]:
+        return set(self.subscriptions.get(target_agent_id, ()))
+
+    def get_followed_agents(self, subscriber_id: str) -> Set[str]:
+        return set(self.following.get(subscriber_id, ()))
 
     def get_cached_workflow(self, workflow_id: str) -> WorkflowData:
-        return self.workflow_cache.get(workflow_id) 
\ No newline at end of file
+        return self.workflow_cache.get(workflow_id)
+
+    def get_workflow_snapshot(self, workflow_id: str, subscriber_id: Optional[str] = None) -> Optional[WorkflowData]:
+        """Return a full copy of a workflow, resynchronising subscriber_id if given"""
+        workflow = self.workflow_cache.get(workflow_id)
+        if workflow is None:
+            return None
+        snapshot = WorkflowData(workflow_id, list(workflow.steps), dict(workflow.metadata), workflow.version)
+        if subscriber_id is not None:
+            self.delivered_versions[(subscriber_id, workflow_id)] = workflow.version
+        return snapshot
@@ -0,0 +1,277 @@
+from typing import Dict, Any, Callable, List, Optional, Set, Tuple
+import asyncio
+import logging
+import queue
+import threading
+import time
+from ..core.interfaces import WorkflowData, TaskData
+from ..core.tracing import tracer, SpanContext, UNSAMPLED_CONTEXT
+from ..utils.exceptions import WorkflowError
+from .persistence import StorageBackend
+
+_STOP = object()
+
+# Called from the writer thread with None on commit or the exception that prevented it
+WriteCallback = Callable[[Optional[Exception]], None]
+Item = Tuple[str, Any, Optional[str], Optional[WriteCallback]]
+# Queued as (enqueued_at, traceparent of the submitter, item)
+Entry = Tuple[float, Optional[Dict[str, str]], Any]
+
+class WriteBehindQueue:
+    """Persists workflows and task results on a background writer thread.
+
+    Only the steps appended since a workflow's previous submission are queued.
+    Submissions return immediately unless the bounded queue is full, in which
+    case they block until the writer catches up. Everything already queued
+    when a batch starts is committed together. When a workflow's write fails,
+    its next submission resends every step since its last commit, or the
+    whole workflow if its row was deleted meanwhile, e.g. by WorkflowArchiver.
+    Exposes
+    save_workflow and get_workflow so it can stand in for a storage backend,
+    e.g. as a cache's spill target; reads see workflows that are still queued.
+    """
+    def __init__(self, storage: StorageBackend, max_queue_size: int = 10000, batch_size: int = 512):
+        self.storage = storage
+        self.batch_size = batch_size
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        # Last version queued and last committed per workflow, and the queued steps not yet written
+        self._queued_versions: Dict[str, int] = {}
+        self._committed_versions: Dict[str, int] = {}
+        self._unwritten: Dict[str, WorkflowData] = {}
+        # Workflows whose last write failed and must be resent from their last commit
+        self._resend: Set[str] = set()
+        self._unwritten_lock = threading.Lock()
+        self._closed = False
+        self.batches_written = 0
+        self.records_written = 0
+        self.write_errors = 0
+        self.last_write_lag = 0.0
+        self.max_write_lag = 0.0
+        self.logger = logging.getLogger(__name__)
+        self._thread = threading.Thread(target=self._run, name="workflow-write-behind", daemon=True)
+        self._thread.start()
+
+    def submit_workflow(self, workflow: WorkflowData, agent_id: str, on_done: Optional[WriteCallback] = None):
+        """Queue the steps appended since this workflow was last submitted"""
+        self._put(self._workflow_item(workflow, agent_id, on_done))
+
+    def submit_task(
+        self,
+        task: TaskData,
+        workflow_id: str,
+        status: str,
+        result: Dict[str, Any],
+        on_done: Optional[WriteCallback] = None
+    ):
+        self._put(('task', (task, workflow_id, status, result), None, on_done))
+
+    async def submit_workflow_async(self, workflow: WorkflowData, agent_id: str, on_done: Optional[WriteCallback] = None):
+        """Like submit_workflow, but waits for queue space without blocking the event loop"""
+        await self._put_async(self._workflow_item(workflow, agent_id, on_done))
+
+    async def submit_task_async(
+        self,
+        task: TaskData,
+        workflow_id: str,
+        status: str,
+        result: Dict[str, Any],
+        on_done: Optional[WriteCallback] = None
+    ):
+        await self._put_async(('task', (task, workflow_id, status, result), None, on_done))
+
+    def _workflow_item(self, workflow: WorkflowData, agent_id: str, on_done: Optional[WriteCallback]):
+        with self._unwritten_lock:
+            queued = min(self._queued_versions.get(workflow.workflow_id, 0), workflow.version)
+            delta = workflow.since(max(queued, workflow.base_version))
+            self._queued_versions[workflow.workflow_id] = workflow.version
+            pending = self._unwritten.get(workflow.workflow_id)
+            if pending is None:
+                self._unwritten[workflow.workflow_id] = delta.copy()
+            else:
+                pending.apply_delta(delta)
+                if workflow.workflow_id in self._resend:
+                    # Carries the steps of the failed write, so the stored history has no gap
+                    self._resend.discard(workflow.workflow_id)
+                    delta = pending.copy()
+        return ('workflow', delta, agent_id, on_done)
+
+    def save_workflow(self, workflow: WorkflowData, agent_id: str):
+        self.submit_workflow(workflow, agent_id)
+
+    def get_workflow(self, workflow_id: str, offset: int = 0, limit: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Read a workflow including its queued steps, optionally only a page of its steps"""
+        with self._unwritten_lock:
+            pending = self._unwritten.get(workflow_id)
+            if pending is not None:
+                pending = pending.copy()
+        stored = self.storage.get_workflow(workflow_id, offset, limit)
+        if pending is None:
+            return stored
+        # Steps from pending.base_version on come from the queue, earlier ones from storage
+        start = offset if stored is not None else max(offset, pending.base_version)
+        head = stored['steps'][:max(0, pending.base_version - start)] if stored is not None else []
+        steps = head + pending.steps[max(0, start - pending.base_version):]
+        if limit is not None:
+            steps = steps[:limit]
+        if stored is None or not pending.is_delta:
+            version = pending.version
+        else:
+            version = max(pending.version, stored['version'])
+        return {
+            'workflow_id': workflow_id,
+            'steps': steps,
+            'metadata': pending.metadata,
+            'version': version,
+            'base_version': start
+        }
+
+    def _put(self, item: Item):
+        if self._closed:
+            raise RuntimeError("WriteBehindQueue is closed")
+        self._queue.put((time.monotonic(), tracer.inject(), item))
+
+    async def _put_async(self, item: Item):
+        if self._closed:
+            raise RuntimeError("WriteBehindQueue is closed")
+        # Built here: the executor thread below would not see the caller's trace
+        entry = (time.monotonic(), tracer.inject(), item)
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            await asyncio.get_running_loop().run_in_executor(None, self._queue.put, entry)
+
+    def flush(self):
+        """Block until everything queued so far has been committed"""
+        self._queue.join()
+
+    def close(self):
+        """Flush outstanding writes and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put((time.monotonic(), None, _STOP))
+        self._thread.join()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'queue_depth': self._queue.qsize(),
+            'batches_written': self.batches_written,
+            'records_written': self.records_written,
+            'write_errors': self.write_errors,
+            'last_write_lag': self.last_write_lag,
+            'max_write_lag': self.max_write_lag
+        }
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            # Group whatever else is already waiting into the same transactions
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if batch[-1][2] is _STOP:
+                stopping = True
+                batch.pop()
+                self._queue.task_done()
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch: List[Entry]):
+        workflows: Dict[str, Tuple[WorkflowData, str]] = {}
+        tasks = []
+        for _, _, (kind, record, agent_id, _) in batch:
+            if kind == 'workflow':
+                # Consecutive deltas of the same workflow are merged into one write
+                if record.workflow_id in workflows:
+                    workflows[record.workflow_id][0].apply_delta(record)
+                    workflows[record.workflow_id] = (workflows[record.workflow_id][0], agent_id)
+                else:
+                    workflows[record.workflow_id] = (record.copy(), agent_id)
+            else:
+                tasks.append(record)
+
+        # The writer thread has no trace of its own; the batch joins its submitters' traces
+        traces: Dict[str, SpanContext] = {}
+        for _, trace_context, _ in batch:
+            context = tracer.extract(trace_context)
+            if context is not None and context.sampled:
+                traces.setdefault(context.trace_id, context)
+        parents = list(traces.values())
+
+        workflow_errors: Dict[str, Exception] = {}
+        task_error: Optional[Exception] = None
+        started = time.time_ns()
+        # Storage spans nest under the first trace; without one, none are recorded
+        with tracer.span(
+            "write_behind.write", parent=parents[0] if parents else UNSAMPLED_CONTEXT, records=len(batch)
+        ):
+            try:
+                if workflows:
+                    self.storage.save_workflows(list(workflows.values()))
+            except Exception:
+                # Retry one by one so a single bad workflow does not sink the batch
+                for workflow, agent_id in workflows.values():
+                    try:
+                        self.storage.save_workflow(workflow, agent_id)
+                    except Exception as e:
+                        workflow_errors[workflow.workflow_id] = e
+            try:
+                if tasks:
+                    self.storage.save_tasks(tasks)
+            except Exception as e:
+                task_error = e
+        # The other traces in the batch waited on the same write
+        finished = time.time_ns()
+        for parent in parents[1:]:
+            tracer.record_span("write_behind.write", started, finished, parent=parent, records=len(batch))
+
+        # A gap with no stored row means the workflow was deleted after its last commit
+        deleted = {
+            workflow_id for workflow_id, e in workflow_errors.items()
+            if isinstance(e, WorkflowError) and self._is_deleted(workflow_id)
+        }
+
+        failed = len(workflow_errors) + (len(tasks) if task_error else 0)
+        if failed:
+            self.write_errors += failed
+            error = task_error or next(iter(workflow_errors.values()))
+            self.logger.error(f"Write-behind failed to save {failed} of {len(batch)} records: {str(error)}")
+        self.batches_written += 1
+        self.records_written += len(batch) - failed
+
+        with self._unwritten_lock:
+            for workflow, _ in workflows.values():
+                workflow_id = workflow.workflow_id
+                if workflow_id in workflow_errors:
+                    if workflow_id in deleted:
+                        # Nothing is stored any more, so only a full snapshot can be written
+                        self._committed_versions.pop(workflow_id, None)
+                    # Keep the unwritten steps; later deltas would start past what is stored
+                    self._queued_versions[workflow_id] = self._committed_versions.get(workflow_id, 0)
+                    self._resend.add(workflow_id)
+                    continue
+                self._committed_versions[workflow_id] = workflow.version
+                self._resend.discard(workflow_id)
+                pending = self._unwritten.get(workflow_id)
+                if pending is not None and pending.version <= workflow.version:
+                    del self._unwritten[workflow_id]
+        self.last_write_lag = time.monotonic() - batch[0][0]
+        self.max_write_lag = max(self.max_write_lag, self.last_write_lag)
+
+        for _, _, (kind, record, _, on_done) in batch:
+            if on_done is not None:
+                error = workflow_errors.get(record.workflow_id) if kind == 'workflow' else task_error
+                try:
+                    on_done(error)
+                except Exception as e:
+                    self.logger.error(f"Write-behind completion callback failed: {str(e)}")
+            self._queue.task_done()
+
+    def _is_deleted(self, workflow_id: str) -> bool:
+        try:
+            return self.storage.get_workflow(workflow_id, 0, 0) is None
+        except Exception:
+            return False